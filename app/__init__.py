@@ -1,17 +1,22 @@
 import os
 from flask import Flask, redirect, url_for
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from flask_login import LoginManager
 from flask_bcrypt import Bcrypt
 
 
 db = SQLAlchemy()
-migrate = Migrate()
 login_manager = LoginManager()
 bcrypt = Bcrypt()
 
 
+def init_migrate(app: Flask) -> None:
+    if "migrate" not in app.extensions:
+        from flask_migrate import Migrate
+
+        Migrate(app, db)
+
+
 def create_app() -> Flask:
     app = Flask(__name__, instance_relative_config=False)
 
@@ -19,8 +24,13 @@ def create_app() -> Flask:
 
     app.config.from_object(Config)
 
+    from . import database
+    database.configure(app)
     db.init_app(app)
-    migrate.init_app(app, db)
+    database.init_app(app)
+    if os.environ.get("FLASK_RUN_FROM_CLI") == "true":
+        # Only the `flask db` commands need Flask-Migrate; Alembic is a large share of worker import time.
+        init_migrate(app)
     login_manager.init_app(app)
     bcrypt.init_app(app)
 
@@ -30,6 +40,19 @@ def create_app() -> Flask:
     # Ensure uploads directory exists
     os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
 
+    from . import instrumentation, metrics, page_cache, storage, user_cache
+    instrumentation.init_app(app)
+    metrics.init_app(app)
+    storage.init_app(app)
+    user_cache.init_app(app)
+    page_cache.init_app(app)
+
+    # Model event listeners that keep derived tables in step with requirements
+    from . import images, live, roster, search, stats, uploads  # noqa: F401
+
+    from .pagination import url_with_args
+    app.add_template_global(url_with_args)
+
     # CLI
     from .cli import register_cli
     register_cli(app)
@@ -37,10 +60,14 @@ def create_app() -> Flask:
     from .auth.routes import auth_bp
     from .requirements.routes import requirements_bp
     from .admin.routes import admin_bp
+    from .chunked_uploads.routes import chunked_uploads_bp
+    from .api.routes import api_bp
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(requirements_bp)
     app.register_blueprint(admin_bp)
+    app.register_blueprint(chunked_uploads_bp)
+    app.register_blueprint(api_bp)
 
     @app.shell_context_processor
     def make_shell_context():
@@ -51,33 +78,17 @@ def create_app() -> Flask:
             "models": models,
         }
 
-    # Ensure DB exists and seed defaults at startup (free-tier friendly)
-    try:
-        from .models import User, Department  # local import to avoid circulars during tooling
+    # Schema and default users come from `flask bootstrap`; AUTO_BOOTSTRAP runs it here for
+    # single-process deployments that cannot run a release step (one query once done).
+    if app.config["AUTO_BOOTSTRAP"]:
+        from . import bootstrap
+
         with app.app_context():
-            db.create_all()
-            defaults = [
-                ("gifts", Department.GIFTS, False, "password"),
-                ("stationery", Department.STATIONERY, False, "password"),
-                ("toys", Department.TOYS, False, "password"),
-                ("books", Department.BOOKS, False, "password"),
-                ("admin", Department.GIFTS, True, "admin123"),
-            ]
-            changed = False
-            for username, dept, is_admin, pwd in defaults:
-                existing = db.session.execute(db.select(User).filter_by(username=username)).scalar_one_or_none()
-                if not existing:
-                    user = User(username=username, department=dept, is_admin=is_admin)
-                    user.set_password(pwd)
-                    db.session.add(user)
-                    changed = True
-            if changed:
-                db.session.commit()
-    except Exception:
-        # If this fails (e.g., during migration tooling), app still starts; first request hook will try again
-        pass
-
-    # Note: Flask 3 removed before_first_request; startup seeding handled above
+            try:
+                if not bootstrap.is_bootstrapped():
+                    bootstrap.run()
+            except Exception:
+                app.logger.exception("Automatic bootstrap failed; run `flask bootstrap`")
 
     return app
 
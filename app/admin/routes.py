@@ -1,8 +1,14 @@
-from flask import Blueprint, render_template, abort, request
+from flask import Blueprint, render_template, abort, request, redirect, url_for, flash
 from flask_login import login_required, current_user
+from sqlalchemy import and_, func, or_
+from sqlalchemy.exc import IntegrityError
 
-from .. import db
-from ..models import Requirement, Department, RequirementStatus
+from .. import db, exporter, roster, stats
+from ..filters import RequirementFilters
+from ..forms import StaffForm
+from ..instrumentation import query_budget
+from ..models import Requirement, Department, RequirementStatus, Staff
+from ..pagination import LIST_COLUMNS, build_page, decode_cursor, keyset_condition, page_size
 
 
 admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
@@ -13,36 +19,136 @@ def require_admin():
         abort(403)
 
 
+def _department_pages(filters, size):
+    """First page of every department in one statement.
+
+    ``ROW_NUMBER()`` is computed over each department partition in both
+    directions so a department being paged backwards (``before_<DEPT>``) can
+    take its rows from the oldest end while the others take the newest. Only
+    ``size + 1`` rows per department ever leave the database.
+    """
+    after_keys = {}
+    before_keys = {}
+    cursor_conditions = []
+    for dept in Department:
+        after_key = decode_cursor(request.args.get(f"after_{dept.name}"))
+        before_key = decode_cursor(request.args.get(f"before_{dept.name}")) if after_key is None else None
+        if after_key is not None:
+            after_keys[dept] = after_key
+            cursor_conditions.append(or_(Requirement.department != dept, keyset_condition(after_key, older=True)))
+        elif before_key is not None:
+            before_keys[dept] = before_key
+            cursor_conditions.append(or_(Requirement.department != dept, keyset_condition(before_key, older=False)))
+
+    newest_first = func.row_number().over(
+        partition_by=Requirement.department,
+        order_by=(Requirement.created_at.desc(), Requirement.id.desc()),
+    )
+    oldest_first = func.row_number().over(
+        partition_by=Requirement.department,
+        order_by=(Requirement.created_at.asc(), Requirement.id.asc()),
+    )
+    ranked = (
+        db.select(*LIST_COLUMNS, newest_first.label("rn_newest"), oldest_first.label("rn_oldest"))
+        .where(*filters, *cursor_conditions)
+        .subquery()
+    )
+    backwards = list(before_keys)
+    q = (
+        db.select(*(ranked.c[column.key] for column in LIST_COLUMNS))
+        .where(
+            or_(
+                and_(ranked.c.department.in_(backwards), ranked.c.rn_oldest <= size + 1),
+                and_(ranked.c.department.not_in(backwards), ranked.c.rn_newest <= size + 1),
+            )
+        )
+        .order_by(ranked.c.department, ranked.c.created_at.desc(), ranked.c.id.desc())
+    )
+
+    rows_by_department = {dept: [] for dept in Department}
+    for item in db.session.execute(q):
+        rows_by_department[item.department].append(item)
+
+    pages = {}
+    for dept, rows in rows_by_department.items():
+        if dept in before_keys:
+            rows.reverse()
+        pages[dept] = build_page(rows, size, after_keys.get(dept), before_keys.get(dept))
+    return pages
+
+
 @admin_bp.route("/")
+@query_budget(6)
 @login_required
 def dashboard():
     require_admin()
-    # Filters
-    staff = request.args.get("staff", "").strip()
-    customer = request.args.get("customer", "").strip()
-    status = (request.args.get("status", "open") or "open").strip().lower()
+    filters = RequirementFilters.from_request()
 
-    by_department = {}
-    for dept in Department:
-        q = db.select(Requirement).where(Requirement.department == dept)
-        if staff:
-            q = q.where(Requirement.staff_name.ilike(f"%{staff}%"))
-        if customer:
-            q = q.where(Requirement.customer_name.ilike(f"%{customer}%"))
-        if status == "open":
-            q = q.where(Requirement.status.in_([RequirementStatus.NEW, RequirementStatus.IN_PROGRESS]))
-        elif status in {"new", "in_progress", "fulfilled"}:
-            q = q.where(Requirement.status == RequirementStatus(status.upper()))
-        items = db.session.execute(q.order_by(Requirement.created_at.desc())).scalars().all()
-        by_department[dept] = items
     return render_template(
         "admin/dashboard.html",
-        by_department=by_department,
+        by_department=_department_pages(filters.clauses(), page_size()),
+        counts=stats.all_counts(),
+        staff_by_department={dept: roster.members(dept) for dept in Department},
         Department=Department,
         RequirementStatus=RequirementStatus,
-        filter_staff=staff,
-        filter_customer=customer,
-        filter_status=status,
+        **filters.template_context(),
     )
 
 
+@admin_bp.route("/export")
+@login_required
+def export():
+    """Every department's filtered requirements (or ``?department=``'s) as CSV or XLSX."""
+    require_admin()
+    filters = RequirementFilters.from_request()
+    query = exporter.export_select().where(*filters.clauses())
+    name = "requirements"
+    department = request.args.get("department", "").upper()
+    if department:
+        if department not in Department.__members__:
+            abort(400, "Unknown department")
+        query = query.where(Requirement.department == Department[department])
+        name = f"requirements-{department.lower()}"
+    try:
+        return exporter.export_response(query, request.args.get("format", "csv").lower(), name)
+    except exporter.ExportError as exc:
+        abort(400, str(exc))
+
+
+@admin_bp.route("/staff", methods=["GET", "POST"])
+@login_required
+def staff():
+    require_admin()
+    form = StaffForm()
+    if form.validate_on_submit():
+        member = Staff(department=Department[form.department.data], name=form.name.data.strip())
+        db.session.add(member)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            flash(f"{member.name} is already on the {member.department.value} roster.", "warning")
+        else:
+            flash(f"Added {member.name} to {member.department.value}.", "success")
+            return redirect(url_for("admin.staff"))
+
+    members = db.session.execute(db.select(Staff).order_by(Staff.department, Staff.id)).scalars().all()
+    by_department = {dept: [] for dept in Department}
+    for member in members:
+        by_department[member.department].append(member)
+    return render_template("admin/staff.html", form=form, by_department=by_department)
+
+
+@admin_bp.route("/staff/<int:staff_id>/toggle", methods=["POST"])
+@login_required
+def toggle_staff(staff_id: int):
+    require_admin()
+    member = db.session.get(Staff, staff_id)
+    if member is None:
+        flash("Staff member not found", "warning")
+        return redirect(url_for("admin.staff"))
+    member.active = not member.active
+    db.session.commit()
+    state = "reactivated" if member.active else "deactivated"
+    flash(f"{member.name} {state}.", "success")
+    return redirect(url_for("admin.staff"))
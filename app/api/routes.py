@@ -0,0 +1,190 @@
+"""Read-only JSON API for integrations.
+
+``GET /api/requirements`` lists requirements in ``(updated_at, id)`` order.
+Pass the returned ``next_cursor`` back as ``updated_since`` to get only what
+changed since the previous call; an ISO timestamp works as a starting point.
+Rows updated in the last ``API_SETTLE_SECONDS`` are held back until
+transactions that started earlier have had time to commit, so a cursor
+never moves past a change that is not visible yet. Deletions leave nothing
+to list; compare ``?fields=id`` listings to find them.
+
+``fields=`` picks the attributes returned (and the columns read).
+Requests authenticate with ``Authorization: Bearer <token>`` (one of
+``API_TOKENS``, all departments) or a logged-in session (the user's own
+department unless admin).
+"""
+import hmac
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from flask import Blueprint, current_app, g, jsonify, request, url_for
+from flask_login import current_user
+from sqlalchemy import bindparam, select, tuple_
+
+from .. import db
+from ..compression import compress_response
+from ..models import Department, Requirement
+from ..pagination import decode_cursor, encode_cursor, page_size
+
+
+api_bp = Blueprint("api", __name__, url_prefix="/api")
+
+FIELDS = {
+    "id": Requirement.id,
+    "department": Requirement.department,
+    "customer_name": Requirement.customer_name,
+    "contact_info": Requirement.contact_info,
+    "details": Requirement.details,
+    "staff_id": Requirement.staff_id,
+    "staff_name": Requirement.staff_name,
+    "status": Requirement.status,
+    "image_url": Requirement.image_filename,
+    "thumbnail_url": Requirement.image_thumb_filename,
+    "created_at": Requirement.created_at,
+    "updated_at": Requirement.updated_at,
+}
+
+
+class ApiError(Exception):
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@api_bp.errorhandler(ApiError)
+def api_error(exc: ApiError):
+    response = jsonify(error=str(exc))
+    if exc.status_code == 401:
+        response.headers["WWW-Authenticate"] = "Bearer"
+    return response, exc.status_code
+
+
+def _token_valid(token: str) -> bool:
+    return any(hmac.compare_digest(token, known) for known in current_app.config["API_TOKENS"])
+
+
+@api_bp.before_request
+def authenticate():
+    auth = request.headers.get("Authorization", "")
+    if auth.startswith("Bearer "):
+        if not _token_valid(auth[len("Bearer "):].strip()):
+            raise ApiError("Invalid API token.", 401)
+        g.api_department = None
+    elif current_user.is_authenticated:
+        g.api_department = None if current_user.is_admin else current_user.department
+    else:
+        raise ApiError("Authentication required.", 401)
+
+
+@api_bp.after_request
+def finish(response):
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return compress_response(response)
+
+
+def _selected_fields() -> Tuple[str, ...]:
+    raw = request.args.get("fields", "").strip()
+    if not raw:
+        return tuple(FIELDS)
+    names = tuple(dict.fromkeys(name.strip() for name in raw.split(",") if name.strip()))
+    unknown = [name for name in names if name not in FIELDS]
+    if unknown:
+        raise ApiError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(FIELDS)}.")
+    return names
+
+
+def _department_scope() -> Optional[Department]:
+    raw = request.args.get("department", "").strip().upper()
+    if not raw:
+        return g.api_department
+    try:
+        department = Department[raw]
+    except KeyError:
+        raise ApiError("Unknown department.")
+    if g.api_department is not None and department != g.api_department:
+        raise ApiError("Not allowed for this department.", 403)
+    return department
+
+
+def _since() -> Optional[Tuple[datetime, int]]:
+    raw = request.args.get("updated_since", "").strip()
+    if not raw:
+        return None
+    key = decode_cursor(raw)
+    if key is not None:
+        return key
+    try:
+        since = datetime.fromisoformat(raw)
+    except ValueError:
+        raise ApiError("updated_since must be a cursor or an ISO timestamp.")
+    if since.tzinfo is not None:
+        # Stored timestamps are naive UTC.
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    return since, 0
+
+
+def _value(name: str, value):
+    if value is None:
+        return None
+    if name in ("image_url", "thumbnail_url"):
+        return url_for("requirements.uploaded_file", filename=value, _external=True)
+    if name in ("department", "status"):
+        return value.name
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _serialize(row, fields: Tuple[str, ...]) -> dict:
+    return {name: _value(name, row._mapping[FIELDS[name]]) for name in fields}
+
+
+@api_bp.route("/requirements")
+def list_requirements():
+    fields = _selected_fields()
+    department = _department_scope()
+    since = _since()
+    size = page_size()
+
+    columns = dict.fromkeys([Requirement.id, Requirement.updated_at, *(FIELDS[name] for name in fields)])
+    settled = datetime.utcnow() - timedelta(seconds=current_app.config["API_SETTLE_SECONDS"])
+    query = select(*columns).where(Requirement.updated_at <= settled)
+    if department is not None:
+        query = query.where(Requirement.department == department)
+    if since is not None:
+        query = query.where(
+            tuple_(Requirement.updated_at, Requirement.id)
+            > tuple_(
+                bindparam(None, since[0], type_=Requirement.updated_at.type),
+                bindparam(None, since[1], type_=Requirement.id.type),
+            )
+        )
+    rows = db.session.execute(
+        query.order_by(Requirement.updated_at.asc(), Requirement.id.asc()).limit(size + 1)
+    ).all()
+
+    has_more = len(rows) > size
+    rows = rows[:size]
+    if rows:
+        next_cursor = encode_cursor(rows[-1].updated_at, rows[-1].id)
+    else:
+        next_cursor = encode_cursor(*since) if since is not None else None
+    return jsonify(
+        items=[_serialize(row, fields) for row in rows],
+        next_cursor=next_cursor,
+        has_more=has_more,
+    )
+
+
+@api_bp.route("/requirements/<int:req_id>")
+def get_requirement(req_id: int):
+    fields = _selected_fields()
+    columns = dict.fromkeys([Requirement.department, Requirement.updated_at, *(FIELDS[name] for name in fields)])
+    row = db.session.execute(select(*columns).where(Requirement.id == req_id)).first()
+    if row is None or (g.api_department is not None and row.department != g.api_department):
+        raise ApiError("Requirement not found.", 404)
+
+    response = jsonify(_serialize(row, fields))
+    response.set_etag(f"{req_id}-{row.updated_at.isoformat()}-{','.join(fields)}")
+    return response.make_conditional(request)
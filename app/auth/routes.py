@@ -1,7 +1,7 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, login_required, current_user
 
-from .. import db
+from .. import db, passwords
 from ..forms import LoginForm
 from ..models import User
 
@@ -21,12 +21,24 @@ def login():
     form = LoginForm()
     if form.validate_on_submit():
         user = db.session.execute(db.select(User).filter_by(username=form.username.data)).scalar_one_or_none()
-        if user and user.check_password(form.password.data):
+        try:
+            valid = user is not None and user.check_password(form.password.data)
+        except passwords.PasswordPoolBusy:
+            flash("Too many sign-ins right now. Please try again in a moment.", "warning")
+            return render_template("auth/login.html", form=form, is_admin_login=is_admin_login), 503, {"Retry-After": "5"}
+        if valid:
             # If admin login requested, verify user is admin
             if is_admin_login and not getattr(user, "is_admin", False):
                 flash("Access denied. Admin privileges required.", "danger")
                 return render_template("auth/login.html", form=form, is_admin_login=True)
             
+            if passwords.needs_rehash(user.password_hash):
+                # Upgrade hashes made with older parameters while the password is at hand.
+                try:
+                    user.set_password(form.password.data)
+                    db.session.commit()
+                except passwords.PasswordPoolBusy:
+                    pass  # try again next login
             login_user(user)
             flash("Logged in successfully.", "success")
             next_page = request.args.get("next")
@@ -0,0 +1,242 @@
+"""Request benchmarks through Flask's test client (``flask bench``).
+
+Each scenario is one page or action timed end to end inside the process:
+routing, views, queries and template rendering, but no network or WSGI
+server. For every scenario the run reports latency percentiles and the
+number of SQL statements per request. Query counts are exact and do not
+depend on the machine, so they catch a new N+1 even where timings are
+noisy.
+
+``--output`` saves the results as JSON. ``--baseline`` compares a run
+against a saved one and fails when a p95 grows by more than
+``--tolerance`` or a scenario starts issuing more queries. Run it against
+a database filled by ``flask gen-data``, never production: the create
+scenario writes requirements (they are deleted again at the end).
+"""
+from __future__ import annotations
+
+import contextvars
+import io
+import statistics
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional
+from uuid import uuid4
+
+from flask import Flask
+from sqlalchemy import event, select
+from sqlalchemy.engine import Engine
+
+from . import db, roster
+from .models import Department, Requirement, User
+
+
+@dataclass
+class Context:
+    department: Department
+    detail_id: int
+    username: str
+    password: str
+    image: bytes
+    marker: str
+    staff_name: str
+
+
+@dataclass
+class Scenario:
+    name: str
+    client: str  # "anonymous", "user" or "admin"
+    call: Callable[["object", Context], "object"]
+    expect: int = 200
+    config: Dict[str, object] = field(default_factory=dict)
+
+
+@dataclass
+class Result:
+    name: str
+    runs: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    queries: float
+    failures: int = 0
+
+
+def _create(client, ctx: Context):
+    return client.post(
+        "/create",
+        data={
+            "customer_name": ctx.marker,
+            "contact_info": "+91 90000 00000",
+            "details": "benchmark request",
+            "staff_name": ctx.staff_name,
+            "image": (io.BytesIO(ctx.image), "bench.jpg"),
+        },
+        content_type="multipart/form-data",
+    )
+
+
+SCENARIOS = (
+    # A fresh client each time, so the shared anonymous client stays logged out.
+    Scenario("login", "anonymous", lambda c, ctx: c.application.test_client().post(
+        "/auth/login", data={"username": ctx.username, "password": ctx.password}), expect=302),
+    Scenario("dashboard", "user", lambda c, ctx: c.get("/")),
+    Scenario("dashboard all statuses", "user", lambda c, ctx: c.get("/?status=all")),
+    Scenario("dashboard search", "user", lambda c, ctx: c.get("/?status=all&q=hamper")),
+    Scenario("browse_dept", "anonymous", lambda c, ctx: c.get(f"/dept/{ctx.department.name}")),
+    Scenario("browse_dept uncached", "anonymous", lambda c, ctx: c.get(f"/dept/{ctx.department.name}"),
+             config={"PAGE_CACHE_ENABLED": False}),
+    Scenario("detail", "user", lambda c, ctx: c.get(f"/{ctx.detail_id}")),
+    Scenario("admin.dashboard", "admin", lambda c, ctx: c.get("/admin/")),
+    Scenario("create with upload", "user", _create, expect=302),
+)
+
+
+@contextmanager
+def _count_queries(engine: Engine) -> Iterator[List[int]]:
+    counter = [0]
+
+    def count(*args):
+        counter[0] += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+
+def _percentile(samples: List[float], pct: int) -> float:
+    if len(samples) < 2:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[pct - 1]
+
+
+def _sample_image() -> bytes:
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (800, 600), (200, 120, 40)).save(buffer, "JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def _login(app: Flask, username: str, password: str, admin: bool = False):
+    client = app.test_client()
+    response = client.post("/auth/login" + ("?admin=1" if admin else ""), data={"username": username, "password": password})
+    if response.status_code != 302:
+        raise RuntimeError(f"could not log in as {username!r}")
+    return client
+
+
+def _prepare(app: Flask, username: str, password: str) -> Context:
+    user = db.session.execute(select(User).filter_by(username=username)).scalar_one_or_none()
+    if user is None:
+        raise RuntimeError(f"no user {username!r}; run `flask bootstrap` or `flask gen-data --users`")
+    department = user.department
+    detail_id = db.session.execute(
+        select(Requirement.id).where(Requirement.department == department).order_by(Requirement.id.desc()).limit(1)
+    ).scalar()
+    if detail_id is None:
+        raise RuntimeError(f"no requirements in {department.value}; run `flask gen-data` first")
+    staff = roster.names(department)
+    return Context(department, detail_id, username, password, _sample_image(), f"bench-{uuid4().hex[:12]}",
+                   staff[0] if staff else "")
+
+
+def run(
+    app: Flask,
+    username: str,
+    password: str,
+    admin_username: str,
+    admin_password: str,
+    iterations: int = 30,
+    warmup: int = 3,
+    only: Optional[List[str]] = None,
+) -> List[Result]:
+    """Run the scenarios, each request in a fresh context as it would arrive from a client.
+
+    The CLI runs commands inside an app context, which test client requests
+    would otherwise share, and with it ``g`` and the logged-in user.
+    """
+    return contextvars.Context().run(
+        _run, app, username, password, admin_username, admin_password, iterations, warmup, only
+    )
+
+
+def _run(app, username, password, admin_username, admin_password, iterations, warmup, only) -> List[Result]:
+    app.config["WTF_CSRF_ENABLED"] = False
+    # A view over its query budget fails the request, and so shows up under failures.
+    app.config["QUERY_BUDGET_ENFORCE"] = True
+    with app.app_context():
+        ctx = _prepare(app, username, password)
+        engine = db.engine
+
+    clients = {
+        "anonymous": app.test_client(),
+        "user": _login(app, username, password),
+        "admin": _login(app, admin_username, admin_password, admin=True),
+    }
+    results = []
+    try:
+        for scenario in SCENARIOS:
+            if only and scenario.name not in only:
+                continue
+            saved = {key: app.config[key] for key in scenario.config}
+            app.config.update(scenario.config)
+            try:
+                results.append(_measure(scenario, clients[scenario.client], ctx, engine, iterations, warmup))
+            finally:
+                app.config.update(saved)
+    finally:
+        with app.app_context():
+            _cleanup(ctx.marker)
+    return results
+
+
+def _measure(scenario: Scenario, client, ctx: Context, engine: Engine, iterations: int, warmup: int) -> Result:
+    for _ in range(warmup):
+        scenario.call(client, ctx)
+    timings, queries, failures = [], [], 0
+    for _ in range(iterations):
+        with _count_queries(engine) as counter:
+            started = time.perf_counter()
+            response = scenario.call(client, ctx)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(counter[0])
+        failures += response.status_code != scenario.expect
+    return Result(
+        name=scenario.name,
+        runs=iterations,
+        p50_ms=round(statistics.median(timings), 2),
+        p95_ms=round(_percentile(timings, 95), 2),
+        p99_ms=round(_percentile(timings, 99), 2),
+        max_ms=round(max(timings), 2),
+        queries=round(statistics.mean(queries), 1),
+        failures=failures,
+    )
+
+
+def _cleanup(marker: str) -> None:
+    # Through the ORM so counters, search index and upload references follow.
+    for requirement in db.session.execute(select(Requirement).filter_by(customer_name=marker)).scalars():
+        db.session.delete(requirement)
+    db.session.commit()
+
+
+def as_json(results: List[Result]) -> Dict[str, dict]:
+    return {result.name: asdict(result) for result in results}
+
+
+def regressions(results: List[Result], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    problems = []
+    for result in results:
+        before = baseline.get(result.name)
+        if before is None:
+            continue
+        if result.p95_ms > before["p95_ms"] * (1 + tolerance):
+            problems.append(f"{result.name}: p95 {result.p95_ms:.1f} ms, baseline {before['p95_ms']:.1f} ms")
+        if result.queries > before["queries"]:
+            problems.append(f"{result.name}: {result.queries:g} queries per request, baseline {before['queries']:g}")
+    return problems
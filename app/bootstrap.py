@@ -0,0 +1,132 @@
+"""One-shot database setup: schema and default accounts.
+
+``flask bootstrap`` is meant to run once per deploy, before the workers
+start. It brings the schema up to date (``flask db upgrade``; an empty
+database is created from the migrations) and creates the default users,
+then records ``bootstrap`` in ``app_state`` so later runs skip the seeding.
+Concurrent runs are serialised: a PostgreSQL advisory lock, or a lock file
+next to a SQLite database, so several workers started with
+``AUTO_BOOTSTRAP`` do not race each other.
+"""
+from __future__ import annotations
+
+import os
+from contextlib import contextmanager
+from typing import Iterator
+
+from flask import current_app
+from sqlalchemy import inspect, select, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from . import db, init_migrate
+from .models import AppState, Department, Staff, User
+
+
+# Bump when DEFAULT_USERS changes so existing deployments pick the change up.
+BOOTSTRAP_VERSION = "1"
+MARKER_KEY = "bootstrap"
+# Arbitrary, stable id for pg_advisory_lock.
+ADVISORY_LOCK_ID = 0x5EED
+
+DEFAULT_USERS = (
+    ("gifts", Department.GIFTS, False, "password"),
+    ("stationery", Department.STATIONERY, False, "password"),
+    ("toys", Department.TOYS, False, "password"),
+    ("books", Department.BOOKS, False, "password"),
+    ("admin", Department.GIFTS, True, "admin123"),
+)
+
+# Only used when the staff table is empty (databases created without the migrations).
+DEFAULT_STAFF = {
+    Department.GIFTS: ("Threeshma", "Ansuya", "Anita", "Harika", "Praveen"),
+    Department.STATIONERY: ("Mastaan", "Sunita", "Akash", "Rajesh"),
+    Department.TOYS: ("Sony", "Sai", "Satya"),
+    Department.BOOKS: ("Anjan", "Shiva", "Lavanya"),
+}
+
+
+@contextmanager
+def _exclusive() -> Iterator[None]:
+    engine = db.engine
+    if engine.dialect.name == "postgresql":
+        with engine.connect() as connection:
+            connection.execute(text("SELECT pg_advisory_lock(:id)"), {"id": ADVISORY_LOCK_ID})
+            connection.commit()  # session-level lock; don't sit idle in a transaction
+            try:
+                yield
+            finally:
+                connection.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": ADVISORY_LOCK_ID})
+                connection.commit()
+    elif engine.dialect.name == "sqlite" and engine.url.database not in (None, "", ":memory:"):
+        import fcntl
+
+        with open(f"{engine.url.database}.bootstrap-lock", "w") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+    else:
+        yield
+
+
+def is_bootstrapped() -> bool:
+    """One cheap query: has ``flask bootstrap`` completed against this database?"""
+    try:
+        value = db.session.execute(select(AppState.value).where(AppState.key == MARKER_KEY)).scalar_one_or_none()
+    except (OperationalError, ProgrammingError):  # no app_state table yet
+        db.session.rollback()
+        return False
+    return value == BOOTSTRAP_VERSION
+
+
+def upgrade_schema() -> str:
+    from flask_migrate import upgrade  # deferred: alembic is only needed here
+
+    init_migrate(current_app)
+    tables = set(inspect(db.engine).get_table_names())
+    if tables and "alembic_version" not in tables:
+        # Created by db.create_all() before migrations were used: fill in missing tables only.
+        db.create_all()
+        return "created missing tables (no migration history; run `flask db stamp` to adopt migrations)"
+    upgrade(directory=os.path.join(current_app.root_path, os.pardir, "migrations"))
+    return "migrated to head"
+
+
+def seed_users() -> int:
+    created = 0
+    for username, dept, is_admin, password in DEFAULT_USERS:
+        existing = db.session.execute(db.select(User).filter_by(username=username)).scalar_one_or_none()
+        if existing:
+            continue
+        user = User(username=username, department=dept, is_admin=is_admin)
+        user.set_password(password)
+        db.session.add(user)
+        created += 1
+    marker = db.session.get(AppState, MARKER_KEY) or AppState(key=MARKER_KEY)
+    marker.value = BOOTSTRAP_VERSION
+    db.session.add(marker)
+    db.session.commit()
+    return created
+
+
+def seed_staff() -> int:
+    if db.session.execute(select(Staff.id).limit(1)).first() is not None:
+        return 0
+    members = [Staff(department=dept, name=name) for dept, names in DEFAULT_STAFF.items() for name in names]
+    db.session.add_all(members)
+    db.session.commit()
+    return len(members)
+
+
+def run(force: bool = False) -> list[str]:
+    """Upgrade the schema and seed defaults unless already done; returns what happened."""
+    report = []
+    with _exclusive():
+        report.append(upgrade_schema())
+        if force or not is_bootstrapped():
+            report.append(f"created {seed_users()} default users")
+            report.append(f"created {seed_staff()} staff")
+        else:
+            report.append("default users already seeded")
+    return report
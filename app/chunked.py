@@ -0,0 +1,235 @@
+"""Resumable chunked uploads.
+
+A client opens an upload with the file's name and total size, appends the
+bytes in chunks at explicit offsets (re-asking for the current offset after
+a dropped connection), then completes it. Each chunk is streamed from the
+request body straight to ``UPLOAD_FOLDER/.partial/<id>.part``, so memory use
+is constant whatever the file size and no single request has to carry the
+whole file. The first ``SNIFF_SIZE`` bytes, however the client splits them
+into chunks, are checked against image magic bytes before anything after
+them is accepted. Writers of one upload are serialised by an exclusive
+``flock`` on its partial file; a second chunk sent while one is still being
+written gets 409 with the current offset, as any offset mismatch does. On completion the file goes through the normal
+content-addressed store and the requirement forms attach it by upload ID.
+
+State lives next to the partial file as ``<id>.json``; all chunks of one
+upload must therefore reach a host that shares ``UPLOAD_FOLDER``. Files are
+limited to ``CHUNKED_UPLOAD_MAX_BYTES`` (``MAX_CONTENT_LENGTH`` unless set)
+and at most ``CHUNKED_UPLOAD_MAX_OPEN`` uploads may be unfinished at once,
+so the endpoints, which the public forms use without a login, cannot fill
+the upload folder.
+"""
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import BinaryIO, Iterator, Optional
+from uuid import uuid4
+
+from flask import current_app
+
+from . import images, uploads
+
+
+CHUNK_READ_SIZE = 64 * 1024
+SNIFF_SIZE = 16  # what images.save_upload reads; WebP needs bytes 8-12
+
+
+class UploadError(ValueError):
+    status_code = 400
+
+
+class UploadNotFound(UploadError):
+    status_code = 404
+
+
+class OffsetMismatch(UploadError):
+    status_code = 409
+
+
+class TooManyUploads(UploadError):
+    status_code = 503
+
+
+@dataclass
+class ChunkedUpload:
+    id: str
+    filename: str
+    size: int
+    offset: int = 0
+    ext: Optional[str] = None
+    key: Optional[str] = None
+    created_at: float = 0.0
+
+    @property
+    def complete(self) -> bool:
+        return self.key is not None
+
+    def to_json(self) -> dict:
+        return {"upload_id": self.id, "offset": self.offset, "size": self.size, "complete": self.complete}
+
+
+def _partial_dir() -> str:
+    path = os.path.join(current_app.config["UPLOAD_FOLDER"], ".partial")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _valid_id(upload_id: str) -> bool:
+    return len(upload_id) == 32 and all(c in "0123456789abcdef" for c in upload_id)
+
+
+def _state_path(upload_id: str) -> str:
+    return os.path.join(_partial_dir(), f"{upload_id}.json")
+
+
+def _part_path(upload_id: str) -> str:
+    return os.path.join(_partial_dir(), f"{upload_id}.part")
+
+
+def _save(upload: ChunkedUpload) -> None:
+    tmp = _state_path(upload.id) + ".tmp"
+    with open(tmp, "w") as fh:
+        json.dump(asdict(upload), fh)
+    os.replace(tmp, _state_path(upload.id))
+
+
+@contextmanager
+def _locked_part(upload_id: str) -> Iterator[BinaryIO]:
+    """The upload's partial file, opened for writing under an exclusive lock."""
+    try:
+        fh = open(_part_path(upload_id), "r+b")
+    except FileNotFoundError:
+        raise OffsetMismatch("Upload already completed.") from None
+    with fh:
+        try:
+            fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise OffsetMismatch("Another chunk of this upload is being written.") from None
+        yield fh
+
+
+def _open_count() -> int:
+    # An unfinished upload is the only thing with a .part file; finish() removes it.
+    return sum(name.endswith(".part") for name in os.listdir(_partial_dir()))
+
+
+def get(upload_id: str) -> ChunkedUpload:
+    if not upload_id or not _valid_id(upload_id):
+        raise UploadNotFound("Unknown upload.")
+    try:
+        with open(_state_path(upload_id)) as fh:
+            upload = ChunkedUpload(**json.load(fh))
+    except FileNotFoundError:
+        raise UploadNotFound("Unknown upload.") from None
+    if not upload.complete and os.path.exists(_part_path(upload_id)):
+        # A chunk cut off mid-request leaves its bytes behind; resume after them.
+        upload.offset = os.path.getsize(_part_path(upload_id))
+    return upload
+
+
+def start(filename: str, size: int) -> ChunkedUpload:
+    try:
+        images.allowed_extension(filename)
+    except images.InvalidImage as exc:
+        raise UploadError(str(exc)) from exc
+    if size <= 0 or size > current_app.config["CHUNKED_UPLOAD_MAX_BYTES"]:
+        raise UploadError("File is empty or too large.")
+    if _open_count() >= current_app.config["CHUNKED_UPLOAD_MAX_OPEN"]:
+        purge_stale()
+        if _open_count() >= current_app.config["CHUNKED_UPLOAD_MAX_OPEN"]:
+            raise TooManyUploads("Too many uploads in progress; try again later.")
+    upload = ChunkedUpload(id=uuid4().hex, filename=filename, size=size, created_at=time.time())
+    open(_part_path(upload.id), "wb").close()
+    _save(upload)
+    return upload
+
+
+def append(upload_id: str, offset: int, stream: BinaryIO) -> ChunkedUpload:
+    """Write the chunk in ``stream`` at ``offset``; the offset must equal the bytes received so far."""
+    if get(upload_id).complete:
+        raise OffsetMismatch("Upload already completed.")
+    with _locked_part(upload_id) as fh:
+        upload = get(upload_id)  # again, now that no other chunk is being written
+        if upload.complete:
+            raise OffsetMismatch("Upload already completed.")
+        if offset != upload.offset:
+            raise OffsetMismatch(f"Expected offset {upload.offset}.")
+
+        fh.seek(offset)
+        written = 0
+        for chunk in iter(lambda: stream.read(CHUNK_READ_SIZE), b""):
+            end = offset + written + len(chunk)
+            if end > upload.size:
+                fh.truncate(offset)
+                raise UploadError("Upload exceeds the declared size.")
+            if upload.ext is None:
+                # Fewer than SNIFF_SIZE bytes have arrived so far; they are all at the start of the file.
+                fh.seek(0)
+                head = fh.read(offset + written) + chunk
+                if len(head) >= SNIFF_SIZE or end == upload.size:
+                    upload.ext = images.sniff_image_type(head[:SNIFF_SIZE])
+                    if upload.ext is None:
+                        fh.truncate(offset)
+                        raise UploadError("File is not a supported image.")
+                    # Recorded before the bytes land: a cut-off chunk resumes from the .part size.
+                    _save(upload)
+            fh.seek(offset + written)
+            fh.write(chunk)
+            written += len(chunk)
+        upload.offset = offset + written
+        _save(upload)
+    return upload
+
+
+def finish(upload_id: str) -> ChunkedUpload:
+    upload = get(upload_id)
+    if upload.complete:
+        return upload
+    with _locked_part(upload_id) as fh:
+        upload = get(upload_id)
+        if upload.complete:
+            return upload
+        if upload.offset != upload.size:
+            raise OffsetMismatch("Upload is incomplete.")
+        try:
+            clean = images.strip_metadata(fh, upload.ext)
+        except images.InvalidImage as exc:
+            raise UploadError(str(exc)) from exc
+        with clean:
+            upload.key = uploads.store(clean, upload.ext)
+        os.remove(_part_path(upload.id))
+        upload.offset = upload.size
+        _save(upload)
+    return upload
+
+
+def completed_key(upload_id: str) -> str:
+    """Storage key of a completed upload, for attaching it to a requirement.
+
+    The state is left in place so a form that fails validation can be
+    resubmitted with the same ID; ``purge_stale`` removes it later, and an
+    upload nothing ends up referencing is collected like any other orphan.
+    """
+    upload = get(upload_id)
+    if not upload.complete:
+        raise UploadError("Upload is incomplete.")
+    return upload.key
+
+
+def purge_stale(max_age: Optional[int] = None) -> int:
+    """Delete uploads older than ``CHUNKED_UPLOAD_TTL_SECONDS`` that were never attached."""
+    max_age = current_app.config["CHUNKED_UPLOAD_TTL_SECONDS"] if max_age is None else max_age
+    cutoff = time.time() - max_age
+    removed = 0
+    folder = _partial_dir()
+    for name in os.listdir(folder):
+        path = os.path.join(folder, name)
+        if os.path.getmtime(path) < cutoff:
+            os.remove(path)
+            removed += name.endswith(".json")
+    return removed
@@ -0,0 +1,72 @@
+from flask import Blueprint, current_app, jsonify, request
+from flask_wtf.csrf import validate_csrf
+from wtforms.validators import ValidationError
+
+from .. import chunked
+
+
+chunked_uploads_bp = Blueprint("chunked_uploads", __name__, url_prefix="/chunked-uploads")
+
+
+@chunked_uploads_bp.before_request
+def check_csrf():
+    # Chunks are raw request bodies, so the token travels in a header rather than a form field.
+    if request.method in ("GET", "HEAD") or not current_app.config.get("WTF_CSRF_ENABLED", True):
+        return None
+    try:
+        validate_csrf(request.headers.get("X-CSRFToken"))
+    except ValidationError as exc:
+        return jsonify(error=str(exc)), 400
+    return None
+
+
+@chunked_uploads_bp.errorhandler(chunked.UploadError)
+def upload_error(exc: chunked.UploadError):
+    body = {"error": str(exc)}
+    if isinstance(exc, chunked.OffsetMismatch):
+        try:
+            body["offset"] = chunked.get(request.view_args["upload_id"]).offset
+        except (chunked.UploadError, KeyError, TypeError):
+            pass
+    headers = {"Retry-After": "60"} if isinstance(exc, chunked.TooManyUploads) else {}
+    return jsonify(body), exc.status_code, headers
+
+
+@chunked_uploads_bp.route("/", methods=["POST"])
+def start():
+    data = request.get_json(silent=True) or {}
+    try:
+        size = int(data.get("size", 0))
+    except (TypeError, ValueError):
+        raise chunked.UploadError("Invalid size.")
+    upload = chunked.start(str(data.get("filename", "")), size)
+    body = upload.to_json()
+    body["chunk_size"] = current_app.config["CHUNKED_UPLOAD_CHUNK_SIZE"]
+    return jsonify(body), 201
+
+
+@chunked_uploads_bp.route("/<upload_id>", methods=["GET", "HEAD"])
+def status(upload_id: str):
+    upload = chunked.get(upload_id)
+    response = jsonify(upload.to_json())
+    response.headers["Upload-Offset"] = str(upload.offset)
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+@chunked_uploads_bp.route("/<upload_id>", methods=["PATCH"])
+def append(upload_id: str):
+    try:
+        offset = int(request.headers.get("Upload-Offset", ""))
+    except ValueError:
+        raise chunked.UploadError("Missing Upload-Offset header.")
+    upload = chunked.append(upload_id, offset, request.stream)
+    response = jsonify(upload.to_json())
+    response.headers["Upload-Offset"] = str(upload.offset)
+    return response
+
+
+@chunked_uploads_bp.route("/<upload_id>/complete", methods=["POST"])
+def complete(upload_id: str):
+    upload = chunked.finish(upload_id)
+    return jsonify(upload.to_json())
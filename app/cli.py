@@ -1,3 +1,10 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+import click
 from flask import Flask
 
 from . import db
@@ -5,6 +12,45 @@ from .models import User, Department
 
 
 def register_cli(app: Flask) -> None:
+    @app.cli.command("bootstrap")
+    @click.option("--force", is_flag=True, help="Seed default users even if bootstrap already ran.")
+    def bootstrap_command(force):
+        """Migrate the database and create the default users (safe to run repeatedly)."""
+        from . import bootstrap
+        for line in bootstrap.run(force=force):
+            print(line)
+
+    @app.cli.command("bench-startup")
+    @click.option("--runs", default=5, show_default=True)
+    @click.option("--max-ms", type=float, help="Exit non-zero if the median boot exceeds this.")
+    def bench_startup(runs, max_ms):
+        """Time a fresh interpreter importing the app and calling create_app(), like a worker boot."""
+        probe = (
+            "import json, time\n"
+            "t0 = time.perf_counter()\n"
+            "from app import create_app\n"
+            "t1 = time.perf_counter()\n"
+            "create_app()\n"
+            "t2 = time.perf_counter()\n"
+            "print(json.dumps({'import': (t1 - t0) * 1000, 'create_app': (t2 - t1) * 1000}))\n"
+        )
+        env = dict(os.environ)
+        env.pop("FLASK_RUN_FROM_CLI", None)  # a worker is not a CLI process
+        root = os.path.dirname(app.root_path)
+        samples = []
+        for _ in range(runs):
+            out = subprocess.run(
+                [sys.executable, "-c", probe], cwd=root, env=env, check=True, capture_output=True, text=True
+            ).stdout
+            samples.append(json.loads(out.strip().splitlines()[-1]))
+        for phase in ("import", "create_app"):
+            values = [s[phase] for s in samples]
+            print(f"{phase:>10}: median {statistics.median(values):7.1f} ms  min {min(values):7.1f} ms")
+        total = statistics.median(s["import"] + s["create_app"] for s in samples)
+        print(f"{'total':>10}: median {total:7.1f} ms over {runs} runs")
+        if max_ms is not None and total > max_ms:
+            raise click.ClickException(f"startup {total:.1f} ms exceeds --max-ms {max_ms:.1f}")
+
     @app.cli.command("seed")
     def seed():
         users = [
@@ -38,4 +84,173 @@ def register_cli(app: Flask) -> None:
             db.session.commit()
             print("Admin user already exists; ensured is_admin=True")
 
+    @app.cli.command("import-requirements")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--department", type=click.Choice([d.name for d in Department], case_sensitive=False),
+                  help="Department for rows without a department column.")
+    @click.option("--created-by", default="admin", show_default=True, help="Username recorded as the creator.")
+    @click.option("--batch-size", default=1000, show_default=True)
+    @click.option("--rejects", type=click.Path(dir_okay=False), help="Where rejected rows go (default: <path>.rejects.csv).")
+    @click.option("--dry-run", is_flag=True, help="Validate only; insert nothing.")
+    def import_requirements(path, department, created_by, batch_size, rejects, dry_run):
+        """Import requirements from a CSV or XLSX file, in batches, writing invalid rows to a rejects file."""
+        import time
+        from . import importer
+        user = importer.find_user(created_by)
+        if user is None:
+            raise click.ClickException(f"No user named {created_by!r}")
+        started = time.monotonic()
+
+        def report(result):
+            rate = result.read / max(time.monotonic() - started, 1e-6)
+            click.echo(f"read {result.read}  imported {result.imported}  rejected {result.rejected}  ({rate:.0f} rows/s)", err=True)
+
+        job = importer.Importer(user, Department[department.upper()] if department else None, batch_size)
+        rejects_path = rejects or f"{path}.rejects.csv"
+        try:
+            rows = importer.read_rows(path)
+            with open(rejects_path, "w", newline="", encoding="utf-8") as fh:
+                result = job.run(rows, importer.reject_writer(fh), dry_run=dry_run, progress=report)
+        except importer.ImportFileError as exc:
+            raise click.ClickException(str(exc))
+        if not result.rejected:
+            os.remove(rejects_path)
+        verb = "Validated" if dry_run else "Imported"
+        print(f"{verb} {result.imported} of {result.read} rows"
+              + (f"; {result.rejected} rejected, see {rejects_path}" if result.rejected else ""))
+
+    @app.cli.command("gen-data")
+    @click.option("--requirements", "count", default=10000, show_default=True, help="Requirements to create.")
+    @click.option("--users", default=0, show_default=True, help="Extra users per department (load-<dept>-<n>).")
+    @click.option("--password", default="password", show_default=True, help="Password for the extra users.")
+    @click.option("--images", default=20, show_default=True, help="Distinct product photos shared by fulfilled rows.")
+    @click.option("--days", default=365, show_default=True, help="How far back requests go.")
+    @click.option("--seed", default=1, show_default=True, help="Random seed; the same options give the same data.")
+    @click.option("--created-by", default="admin", show_default=True)
+    @click.option("--batch-size", default=2000, show_default=True)
+    def gen_data(count, users, password, images, days, seed, created_by, batch_size):
+        """Fill the database with synthetic requirements, users and images for load testing."""
+        from . import datagen, importer
+        user = importer.find_user(created_by)
+        if user is None:
+            raise click.ClickException(f"No user named {created_by!r}; run `flask bootstrap` first")
+        generator = datagen.Generator(seed=seed, days=days)
+        result = generator.run(
+            count, user, users=users, password=password, image_count=images, batch_size=batch_size,
+            progress=lambda done: click.echo(f"{done}/{count} requirements", err=True),
+        )
+        print(f"Created {result.requirements} requirements, {result.users} users and {result.images} images")
+
+    @app.cli.command("bench")
+    @click.option("--iterations", default=30, show_default=True)
+    @click.option("--warmup", default=3, show_default=True)
+    @click.option("--scenario", "only", multiple=True, help="Run only this scenario (repeatable).")
+    @click.option("--user", default="gifts", show_default=True)
+    @click.option("--password", default="password", show_default=True)
+    @click.option("--admin-user", default="admin", show_default=True)
+    @click.option("--admin-password", default="admin123", show_default=True)
+    @click.option("--output", type=click.Path(dir_okay=False), help="Save results as JSON.")
+    @click.option("--baseline", type=click.Path(exists=True, dir_okay=False), help="Fail on regressions against saved results.")
+    @click.option("--tolerance", default=0.25, show_default=True, help="Allowed p95 growth over the baseline.")
+    def bench(iterations, warmup, only, user, password, admin_user, admin_password, output, baseline, tolerance):
+        """Time the main pages through the test client: latency percentiles and queries per request."""
+        from . import bench as benchmarks
+        try:
+            results = benchmarks.run(app, user, password, admin_user, admin_password, iterations, warmup, list(only))
+        except RuntimeError as exc:
+            raise click.ClickException(str(exc))
+        print(f"{'scenario':<24}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'queries':>9}")
+        for result in results:
+            print(f"{result.name:<24}{result.p50_ms:>9.1f}{result.p95_ms:>9.1f}{result.p99_ms:>9.1f}"
+                  f"{result.max_ms:>9.1f}{result.queries:>9g}" + (f"  {result.failures} FAILED" if result.failures else ""))
+        if output:
+            with open(output, "w") as fh:
+                json.dump(benchmarks.as_json(results), fh, indent=2)
+        problems = [f"{r.name}: {r.failures} unexpected responses" for r in results if r.failures]
+        if baseline:
+            with open(baseline) as fh:
+                problems += benchmarks.regressions(results, json.load(fh), tolerance)
+        if problems:
+            raise click.ClickException("benchmark regressions:\n  " + "\n  ".join(problems))
+
+    @app.cli.command("stress-db")
+    @click.option("--processes", default=4, show_default=True, help="Worker processes, each with its own app.")
+    @click.option("--seconds", default=10.0, show_default=True)
+    @click.option("--write-ratio", default=0.2, show_default=True, help="Share of operations that write.")
+    def stress_db(processes, seconds, write_ratio):
+        """Hammer the database with concurrent reads and writes; fails on any database error."""
+        from . import database, stress
+        if database.is_sqlite(app.config["SQLALCHEMY_DATABASE_URI"]):
+            pragmas = ", ".join(
+                f"{name}={db.session.execute(db.text(f'PRAGMA {name}')).scalar()}"
+                for name in ("journal_mode", "synchronous", "busy_timeout")
+            )
+            print(f"SQLite: {pragmas}")
+        try:
+            summaries, errors = stress.run(processes, seconds, write_ratio)
+        except RuntimeError as exc:
+            raise click.ClickException(str(exc))
+        print(f"{'operation':<12}{'count':>9}{'per s':>9}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}")
+        for summary in summaries:
+            print(f"{summary.operation:<12}{summary.count:>9}{summary.per_second:>9.1f}"
+                  f"{summary.p50_ms:>9.1f}{summary.p95_ms:>9.1f}{summary.max_ms:>9.1f}")
+        if errors:
+            raise click.ClickException(
+                "database errors:\n  " + "\n  ".join(f"{name}: {count}" for name, count in sorted(errors.items()))
+            )
+
+    @app.cli.command("reindex-search")
+    def reindex_search():
+        """Rebuild the full-text search index from the requirements table, e.g. after raw SQL edits."""
+        from . import search
+        with db.engine.begin() as connection:
+            search.rebuild(connection)
+        print("Search index rebuilt")
+
+    @app.cli.command("rebuild-counters")
+    def rebuild_counters():
+        """Recount the per-department status counters from the requirements table."""
+        from . import stats
+        with db.engine.begin() as connection:
+            stats.rebuild(connection)
+        print("Requirement counters rebuilt")
+
+    @app.cli.command("check-query-plans")
+    @click.option("--verbose", is_flag=True, help="Print every plan, not only failing ones.")
+    def check_query_plans(verbose):
+        """Fail if a dashboard query stops using its composite index or needs a sort."""
+        from . import query_plans
+        results = query_plans.run_checks()
+        if results is None:
+            print(f"Skipped: no plan checks for {db.engine.dialect.name}")
+            return
+        for result in results:
+            print(f"{'ok  ' if result.ok else 'FAIL'} {result.name}: {', '.join(result.used) or 'no index'}"
+                  f"{' + sort' if result.sorted else ''}")
+            if verbose or not result.ok:
+                print("     " + result.plan.replace("\n", "\n     "))
+        if not all(result.ok for result in results):
+            raise click.ClickException("dashboard queries are not served by their indexes")
+
+    @app.cli.command("generate-image-variants")
+    def generate_image_variants():
+        """Create thumbnails for images uploaded before variants existed."""
+        from . import images
+        from .models import Requirement
+        filenames = db.session.execute(
+            db.select(Requirement.image_filename)
+            .where(Requirement.image_filename.is_not(None), Requirement.image_thumb_filename.is_(None))
+            .distinct()
+        ).scalars().all()
+        app.config["IMAGE_PROCESSING_SYNC"] = True
+        for filename in filenames:
+            images.schedule_variants(filename)
+        print(f"Processed {len(filenames)} images")
 
+    @app.cli.command("gc-uploads")
+    def gc_uploads():
+        """Delete uploaded files that no requirement references, and stale chunked uploads."""
+        from . import chunked, uploads
+        purged = chunked.purge_stale()
+        removed = uploads.sweep()
+        print(f"Removed {removed} unreferenced uploads and {purged} stale chunked uploads")
@@ -0,0 +1,54 @@
+"""Response compression for the JSON API.
+
+Bodies of at least ``COMPRESS_MIN_SIZE`` bytes are compressed with Brotli
+when the client accepts ``br`` and the ``brotli`` package is installed,
+otherwise with gzip. Streaming responses and ones that already carry a
+``Content-Encoding`` are left alone. When the app runs behind a proxy that
+compresses, set ``COMPRESS_RESPONSES=0``.
+"""
+from __future__ import annotations
+
+import gzip
+
+from flask import Response, current_app, request
+
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+
+def _accepts(encoding: str) -> bool:
+    return request.accept_encodings[encoding] > 0
+
+
+def compress_response(response: Response) -> Response:
+    config = current_app.config
+    response.vary.add("Accept-Encoding")
+    if (
+        not config["COMPRESS_RESPONSES"]
+        or response.direct_passthrough
+        or response.is_streamed
+        or response.status_code < 200
+        or response.status_code in (204, 304)
+        or "Content-Encoding" in response.headers
+    ):
+        return response
+    body = response.get_data()
+    if len(body) < config["COMPRESS_MIN_SIZE"]:
+        return response
+
+    if brotli is not None and _accepts("br"):
+        response.set_data(brotli.compress(body, quality=config["COMPRESS_BROTLI_QUALITY"]))
+        response.headers["Content-Encoding"] = "br"
+    elif _accepts("gzip"):
+        response.set_data(gzip.compress(body, compresslevel=config["COMPRESS_GZIP_LEVEL"]))
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        return response
+    if response.headers.get("ETag"):
+        # The compressed bytes differ, so a strong validator must not be shared with the identity body.
+        etag, weak = response.get_etag()
+        response.set_etag(etag, weak=True)
+    return response
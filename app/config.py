@@ -5,9 +5,99 @@ class Config:
     SECRET_KEY = os.environ.get("SECRET_KEY", "dev-secret-change-me")
     SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL", "sqlite:///app.db")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Engine profile (app/database.py). SQLite: pragmas set on every connection ("" / 0 keeps SQLite's default)
+    SQLITE_JOURNAL_MODE = os.environ.get("SQLITE_JOURNAL_MODE", "wal").lower()
+    SQLITE_SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "normal").lower()
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", 5000))
+    SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get("SQLITE_CACHE_SIZE_KB", 16 * 1024))
+    # Other backends (PostgreSQL): connection pool per process
+    DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+    DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+    DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+    DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "true").lower() in {"1", "true", "yes"}
+    # Run `flask bootstrap` (migrations + default users) from create_app if it has never run
+    AUTO_BOOTSTRAP = os.environ.get("AUTO_BOOTSTRAP", "").lower() in {"1", "true", "yes"}
     BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
     UPLOAD_FOLDER = os.environ.get("UPLOAD_FOLDER", os.path.join(BASE_DIR, "uploads"))
     MAX_CONTENT_LENGTH = int(os.environ.get("MAX_CONTENT_LENGTH_BYTES", 5 * 1024 * 1024))
     ALLOWED_IMAGE_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "webp"}
+    # "sharded" (default), "local" or "s3"; see app/storage.py
+    UPLOAD_STORAGE = os.environ.get("UPLOAD_STORAGE", "sharded").lower()
+    S3_BUCKET = os.environ.get("S3_BUCKET", "")
+    S3_PREFIX = os.environ.get("S3_PREFIX", "uploads")
+    S3_ENDPOINT_URL = os.environ.get("S3_ENDPOINT_URL")  # e.g. http://minio:9000
+    S3_REGION = os.environ.get("S3_REGION")
+    S3_ACCESS_KEY_ID = os.environ.get("S3_ACCESS_KEY_ID")
+    S3_SECRET_ACCESS_KEY = os.environ.get("S3_SECRET_ACCESS_KEY")
+    S3_PUBLIC_URL = os.environ.get("S3_PUBLIC_URL")  # CDN/public bucket base; presigned URLs otherwise
+    S3_PRESIGN_EXPIRES = int(os.environ.get("S3_PRESIGN_EXPIRES", 3600))
+    S3_MULTIPART_CHUNK_SIZE = int(os.environ.get("S3_MULTIPART_CHUNK_SIZE", 8 * 1024 * 1024))
+    UPLOAD_CACHE_MAX_AGE = int(os.environ.get("UPLOAD_CACHE_MAX_AGE", 365 * 24 * 3600))
+    # "" (Flask streams the file), "x-accel" (Nginx X-Accel-Redirect) or "x-sendfile"
+    UPLOAD_SENDFILE_MODE = os.environ.get("UPLOAD_SENDFILE_MODE", "").lower()
+    UPLOAD_ACCEL_PREFIX = os.environ.get("UPLOAD_ACCEL_PREFIX", "/protected-uploads")
+    USE_X_SENDFILE = UPLOAD_SENDFILE_MODE == "x-sendfile"
+    UPLOAD_GC_GRACE_SECONDS = int(os.environ.get("UPLOAD_GC_GRACE_SECONDS", 60))
+    # Resumable uploads (app/chunked.py): whole-file limit, client chunk size, lifetime of unfinished uploads
+    CHUNKED_UPLOAD_MAX_BYTES = int(os.environ.get("CHUNKED_UPLOAD_MAX_BYTES", MAX_CONTENT_LENGTH))
+    # Unfinished uploads allowed at once (all clients); bounds the disk .partial can take
+    CHUNKED_UPLOAD_MAX_OPEN = int(os.environ.get("CHUNKED_UPLOAD_MAX_OPEN", 50))
+    CHUNKED_UPLOAD_CHUNK_SIZE = int(os.environ.get("CHUNKED_UPLOAD_CHUNK_SIZE", 1024 * 1024))
+    CHUNKED_UPLOAD_TTL_SECONDS = int(os.environ.get("CHUNKED_UPLOAD_TTL_SECONDS", 24 * 3600))
+    IMAGE_WORKERS = int(os.environ.get("IMAGE_WORKERS", 2))
+    IMAGE_PROCESSING_SYNC = os.environ.get("IMAGE_PROCESSING_SYNC", "").lower() in {"1", "true", "yes"}
+    IMAGE_THUMB_SIZE = int(os.environ.get("IMAGE_THUMB_SIZE", 320))
+    IMAGE_MEDIUM_SIZE = int(os.environ.get("IMAGE_MEDIUM_SIZE", 1280))
+    IMAGE_WEBP_QUALITY = int(os.environ.get("IMAGE_WEBP_QUALITY", 80))
+    # Password hashing (app/passwords.py): "bcrypt" or "argon2" (argon2id, needs argon2-cffi)
+    PASSWORD_SCHEME = os.environ.get("PASSWORD_SCHEME", "bcrypt").lower()
+    BCRYPT_LOG_ROUNDS = int(os.environ.get("BCRYPT_LOG_ROUNDS", 12))
+    ARGON2_TIME_COST = int(os.environ.get("ARGON2_TIME_COST", 2))
+    ARGON2_MEMORY_COST = int(os.environ.get("ARGON2_MEMORY_COST", 19 * 1024))  # KiB
+    ARGON2_PARALLELISM = int(os.environ.get("ARGON2_PARALLELISM", 1))
+    PASSWORD_WORKERS = int(os.environ.get("PASSWORD_WORKERS", 2))
+    PASSWORD_QUEUE_LIMIT = int(os.environ.get("PASSWORD_QUEUE_LIMIT", 8))
+    # Logged-in user cache (app/user_cache.py); CACHE_REDIS_URL adds a cache shared by all processes
+    CACHE_REDIS_URL = os.environ.get("CACHE_REDIS_URL")
+    USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", 1024))
+    USER_CACHE_TTL = int(os.environ.get("USER_CACHE_TTL", 30))
+    USER_CACHE_SHARED_TTL = int(os.environ.get("USER_CACHE_SHARED_TTL", 300))
+    # Rendered public department pages (app/page_cache.py); shared through CACHE_REDIS_URL when set
+    PAGE_CACHE_ENABLED = os.environ.get("PAGE_CACHE_ENABLED", "true").lower() in {"1", "true", "yes"}
+    PAGE_CACHE_SIZE = int(os.environ.get("PAGE_CACHE_SIZE", 256))
+    PAGE_CACHE_TTL = int(os.environ.get("PAGE_CACHE_TTL", 300))
+    # Seconds between checks whether another process changed the staff roster
+    ROSTER_CHECK_INTERVAL = float(os.environ.get("ROSTER_CHECK_INTERVAL", 5))
+    # Live dashboard updates over Server-Sent Events (app/live.py); needs threaded or async workers
+    LIVE_UPDATES_ENABLED = os.environ.get("LIVE_UPDATES_ENABLED", "").lower() in {"1", "true", "yes"}
+    LIVE_POLL_INTERVAL = float(os.environ.get("LIVE_POLL_INTERVAL", 5))
+    LIVE_LOOKBACK_SECONDS = float(os.environ.get("LIVE_LOOKBACK_SECONDS", 2))
+    LIVE_STREAM_SECONDS = int(os.environ.get("LIVE_STREAM_SECONDS", 300))
+    LIVE_MAX_STREAMS = int(os.environ.get("LIVE_MAX_STREAMS", 32))
+    # JSON API (app/api): bearer tokens for integrations, comma-separated; sessions work too
+    API_TOKENS = [token.strip() for token in os.environ.get("API_TOKENS", "").split(",") if token.strip()]
+    # Rows changed more recently than this are held back from listings until concurrent commits land
+    API_SETTLE_SECONDS = float(os.environ.get("API_SETTLE_SECONDS", 2))
+    COMPRESS_RESPONSES = os.environ.get("COMPRESS_RESPONSES", "true").lower() in {"1", "true", "yes"}
+    COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", 1024))
+    COMPRESS_GZIP_LEVEL = int(os.environ.get("COMPRESS_GZIP_LEVEL", 6))
+    COMPRESS_BROTLI_QUALITY = int(os.environ.get("COMPRESS_BROTLI_QUALITY", 5))
+    # Rows fetched per round trip when streaming CSV/XLSX exports (app/exporter.py)
+    EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", 1000))
+    # Per-request SQL accounting (app/instrumentation.py): Server-Timing header, slow-query and request logs
+    INSTRUMENTATION_ENABLED = os.environ.get("INSTRUMENTATION_ENABLED", "true").lower() in {"1", "true", "yes"}
+    SERVER_TIMING_ENABLED = os.environ.get("SERVER_TIMING_ENABLED", "true").lower() in {"1", "true", "yes"}
+    REQUEST_LOG_ENABLED = os.environ.get("REQUEST_LOG_ENABLED", "").lower() in {"1", "true", "yes"}
+    SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", 100))
+    # Statements a view may run per request unless it sets its own (0 disables); enforcing raises instead of logging
+    QUERY_BUDGET = int(os.environ.get("QUERY_BUDGET", 20))
+    QUERY_BUDGET_ENFORCE = os.environ.get("QUERY_BUDGET_ENFORCE", "").lower() in {"1", "true", "yes"}
+    # Prometheus metrics at /metrics (app/metrics.py, needs prometheus-client); METRICS_TOKEN requires a bearer token
+    METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "").lower() in {"1", "true", "yes"}
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+    REQUIREMENTS_PAGE_SIZE = int(os.environ.get("REQUIREMENTS_PAGE_SIZE", 50))
+    REQUIREMENTS_MAX_PAGE_SIZE = int(os.environ.get("REQUIREMENTS_MAX_PAGE_SIZE", 200))
 
 
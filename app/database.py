@@ -0,0 +1,93 @@
+"""Engine settings for the configured database.
+
+SQLite (the default ``sqlite:///app.db``) gets these pragmas on every new
+connection:
+
+* ``journal_mode=WAL``: readers no longer block the writer or each other,
+  so dashboards keep rendering in other Gunicorn workers while one worker
+  commits a status change;
+* ``busy_timeout``: a writer waits up to ``SQLITE_BUSY_TIMEOUT_MS`` for
+  another writer instead of failing with "database is locked";
+* ``synchronous=NORMAL``: with WAL, commits skip an fsync and survive an
+  application crash (a power cut can lose the last transactions);
+* ``mmap_size`` and ``cache_size``: fewer read syscalls and a larger page
+  cache per connection.
+
+An empty ``SQLITE_JOURNAL_MODE`` / ``SQLITE_SYNCHRONOUS`` leaves SQLite's
+own setting, and 0 turns off the mmap and cache sizes. WAL needs the
+database file on a local disk, not a network share.
+
+Other backends (PostgreSQL) get the pool options: ``DB_POOL_SIZE`` and
+``DB_MAX_OVERFLOW`` per process, ``DB_POOL_TIMEOUT``, ``DB_POOL_RECYCLE``
+and ``DB_POOL_PRE_PING``, which checks a connection before use so a
+restarted database or an idle-killed connection costs a reconnect rather
+than a failed request.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict
+
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+from . import db
+
+
+def is_sqlite(uri: str) -> bool:
+    return make_url(uri).get_backend_name() == "sqlite"
+
+
+def engine_options(config) -> Dict[str, Any]:
+    """``SQLALCHEMY_ENGINE_OPTIONS`` for ``SQLALCHEMY_DATABASE_URI``; explicit options win."""
+    if is_sqlite(config["SQLALCHEMY_DATABASE_URI"]):
+        # File connections are cheap and local; SQLite is tuned through the pragmas below.
+        options: Dict[str, Any] = {}
+    else:
+        options = {
+            "pool_size": config["DB_POOL_SIZE"],
+            "max_overflow": config["DB_MAX_OVERFLOW"],
+            "pool_timeout": config["DB_POOL_TIMEOUT"],
+            "pool_recycle": config["DB_POOL_RECYCLE"],
+            "pool_pre_ping": config["DB_POOL_PRE_PING"],
+        }
+    options.update(config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+    return options
+
+
+def sqlite_pragmas(config) -> Dict[str, object]:
+    pragmas = {"busy_timeout": config["SQLITE_BUSY_TIMEOUT_MS"]}
+    # journal_mode first: it is persistent and only takes effect outside a transaction.
+    if config["SQLITE_JOURNAL_MODE"]:
+        pragmas = {"journal_mode": config["SQLITE_JOURNAL_MODE"], **pragmas}
+    if config["SQLITE_SYNCHRONOUS"]:
+        pragmas["synchronous"] = config["SQLITE_SYNCHRONOUS"]
+    if config["SQLITE_MMAP_SIZE"]:
+        pragmas["mmap_size"] = config["SQLITE_MMAP_SIZE"]
+    if config["SQLITE_CACHE_SIZE_KB"]:
+        pragmas["cache_size"] = -config["SQLITE_CACHE_SIZE_KB"]  # negative: KiB rather than pages
+    return pragmas
+
+
+def configure(app: Flask) -> None:
+    """Set the engine options; call before ``db.init_app``."""
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config)
+
+
+def init_app(app: Flask) -> None:
+    """Apply the SQLite pragmas to each new connection; call after ``db.init_app``."""
+    with app.app_context():
+        engines = list(db.engines.values())
+    pragmas = sqlite_pragmas(app.config)
+    for engine in engines:
+        if engine.dialect.name != "sqlite":
+            continue
+
+        @event.listens_for(engine, "connect")
+        def _set_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            try:
+                for name, value in pragmas.items():
+                    cursor.execute(f"PRAGMA {name}={value}")
+            finally:
+                cursor.close()
@@ -0,0 +1,184 @@
+"""Synthetic data for load testing (``flask gen-data``).
+
+Everything is drawn from one seeded ``random.Random``, so the same options
+give the same data set. The shape follows the shop:
+
+* departments are unevenly busy (``DEPARTMENT_WEIGHTS``);
+* requests arrive over the last ``days``, more of them recently, on
+  weekdays and during opening hours;
+* older requests are mostly fulfilled, recent ones mostly new or in
+  progress, and every fulfilled one has a product photo from a pool of
+  generated images (so uploads are shared, as re-used photos are);
+* staff come from each department's roster.
+
+Rows are written with :func:`app.importer.insert_batch`, the bulk path
+that also fills the search index and the status counters.
+"""
+from __future__ import annotations
+
+import io
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from flask import current_app
+
+from . import db, images, roster, uploads
+from .importer import insert_batch
+from .models import Department, RequirementStatus, User
+
+
+DEPARTMENT_WEIGHTS = {
+    Department.GIFTS: 0.35,
+    Department.STATIONERY: 0.25,
+    Department.TOYS: 0.25,
+    Department.BOOKS: 0.15,
+}
+# (age in days up to, weights for NEW, IN_PROGRESS, FULFILLED)
+STATUS_BY_AGE = (
+    (2, (0.55, 0.35, 0.10)),
+    (14, (0.25, 0.35, 0.40)),
+    (60, (0.08, 0.17, 0.75)),
+    (None, (0.02, 0.05, 0.93)),
+)
+FIRST_NAMES = ("Aarav", "Priya", "Rahul", "Sneha", "Vikram", "Lakshmi", "Arjun", "Divya", "Kiran", "Meera",
+               "Ravi", "Anjali", "Suresh", "Pooja", "Naveen", "Kavya", "Manoj", "Swathi", "Ganesh", "Deepa")
+LAST_NAMES = ("Reddy", "Sharma", "Rao", "Kumar", "Naidu", "Iyer", "Patel", "Gupta", "Varma", "Chowdary")
+ITEMS = {
+    Department.GIFTS: ("photo frame", "gift hamper", "soft toy bouquet", "wall clock", "crystal showpiece"),
+    Department.STATIONERY: ("A4 ruled notebooks", "geometry box", "fountain pen", "drawing sheets", "file folders"),
+    Department.TOYS: ("remote control car", "building blocks set", "doll house", "board game", "puzzle 500 pcs"),
+    Department.BOOKS: ("NCERT class 10 set", "Telugu novel", "GRE guide", "children's story book", "atlas"),
+}
+REQUESTS = ("Customer wants {item}, will pick up on {day}.", "Need {item} in stock by {day}; call before.",
+            "Asked for {item}; check price with supplier.", "{item} x{qty}, bulk order for {day}.")
+DAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+OPENING_HOURS = range(9, 21)
+
+
+@dataclass
+class GenerateResult:
+    requirements: int = 0
+    users: int = 0
+    images: int = 0
+
+
+class Generator:
+    def __init__(self, seed: int = 1, days: int = 365, now: Optional[datetime] = None):
+        self.random = random.Random(seed)
+        self.days = days
+        self.now = now or datetime.utcnow()
+        self.staff: Dict[Department, List] = {dept: list(roster.members(dept, active_only=True)) for dept in Department}
+
+    def _created_at(self) -> datetime:
+        # Skewed towards recent days (a growing shop), then moved onto an opening hour of a weekday mostly.
+        age = int(self.days * self.random.random() ** 1.6)
+        day = self.now - timedelta(days=age)
+        if day.weekday() == 6 and self.random.random() < 0.6:
+            day -= timedelta(days=1)
+        moment = day.replace(
+            hour=self.random.choice(OPENING_HOURS), minute=self.random.randrange(60),
+            second=self.random.randrange(60), microsecond=self.random.randrange(1_000_000),
+        )
+        return min(moment, self.now)
+
+    def _status(self, created_at: datetime) -> RequirementStatus:
+        age = (self.now - created_at).days
+        for limit, weights in STATUS_BY_AGE:
+            if limit is None or age <= limit:
+                return self.random.choices(list(RequirementStatus), weights)[0]
+        raise AssertionError("unreachable")
+
+    def make_images(self, count: int) -> List[str]:
+        """Store ``count`` distinct JPEG photos and return their upload keys."""
+        from PIL import Image, ImageDraw
+
+        keys = []
+        for index in range(count):
+            colour = tuple(self.random.randrange(256) for _ in range(3))
+            image = Image.new("RGB", (640, 480), colour)
+            draw = ImageDraw.Draw(image)
+            for _ in range(12):
+                x, y = self.random.randrange(600), self.random.randrange(440)
+                draw.rectangle((x, y, x + 40, y + 40), fill=tuple(self.random.randrange(256) for _ in range(3)))
+            draw.text((20, 20), f"sample {index}", fill=(0, 0, 0))
+            buffer = io.BytesIO()
+            image.save(buffer, "JPEG", quality=80)
+            buffer.seek(0)
+            keys.append(uploads.store(buffer, "jpg"))
+        return keys
+
+    def make_users(self, per_department: int, password: str) -> int:
+        created = 0
+        for dept in Department:
+            for index in range(1, per_department + 1):
+                username = f"load-{dept.name.lower()}-{index}"
+                if db.session.execute(db.select(User.id).filter_by(username=username)).first():
+                    continue
+                user = User(username=username, department=dept)
+                user.set_password(password)
+                db.session.add(user)
+                created += 1
+        db.session.commit()
+        return created
+
+    def requirement(self, created_by_id: int, image_keys: List[str]) -> dict:
+        department = self.random.choices(list(DEPARTMENT_WEIGHTS), list(DEPARTMENT_WEIGHTS.values()))[0]
+        created_at = self._created_at()
+        status = self._status(created_at)
+        staff = self.random.choice(self.staff[department]) if self.staff[department] else None
+        updated_at = created_at
+        if status != RequirementStatus.NEW:
+            updated_at = min(created_at + timedelta(hours=self.random.expovariate(1 / 36)), self.now)
+        image = self.random.choice(image_keys) if image_keys and status == RequirementStatus.FULFILLED else None
+        text = self.random.choice(REQUESTS).format(
+            item=self.random.choice(ITEMS[department]), day=self.random.choice(DAYS), qty=self.random.randint(2, 40)
+        )
+        return {
+            "customer_name": f"{self.random.choice(FIRST_NAMES)} {self.random.choice(LAST_NAMES)}",
+            "contact_info": f"+91 9{self.random.randrange(10**9):09d}",
+            "details": text,
+            "department": department,
+            "staff_name": staff.name if staff else "Unassigned",
+            "staff_id": staff.id if staff else None,
+            "status": status,
+            "image_filename": image,
+            "image_thumb_filename": images.variant_name(image, "thumb") if image else None,
+            "image_medium_filename": images.variant_name(image, "medium") if image else None,
+            "created_at": created_at,
+            "updated_at": updated_at,
+            "created_by_id": created_by_id,
+        }
+
+    def run(
+        self,
+        requirements: int,
+        created_by: User,
+        users: int = 0,
+        password: str = "password",
+        image_count: int = 20,
+        batch_size: int = 2000,
+        progress: Optional[Callable[[int], None]] = None,
+    ) -> GenerateResult:
+        result = GenerateResult()
+        result.users = self.make_users(users, password) if users else 0
+        keys = self.make_images(image_count) if image_count else []
+        result.images = len(keys)
+
+        created_by_id = created_by.id
+        while result.requirements < requirements:
+            batch = [
+                self.requirement(created_by_id, keys)
+                for _ in range(min(batch_size, requirements - result.requirements))
+            ]
+            insert_batch(batch)
+            result.requirements += len(batch)
+            if progress is not None:
+                progress(result.requirements)
+
+        # The rows already name their variants (names are derived from the original); write the files.
+        app = current_app._get_current_object()
+        for key in keys:
+            images.generate_variants(app, key)
+        return result
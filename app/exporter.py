@@ -0,0 +1,146 @@
+"""Streaming CSV / XLSX export of filtered requirement lists.
+
+The export runs the dashboard's own query (same filters, newest first)
+with ``yield_per``, so rows come off a server-side cursor in batches of
+``EXPORT_BATCH_SIZE`` and are written out as they arrive; memory stays
+flat however much history is exported.
+
+CSV is sent while it is produced: the first bytes leave after the first
+batch. XLSX is a zip archive, which openpyxl can only finish at the end,
+so the sheet is written row by row to a temporary file (write-only mode)
+and the file is streamed once complete. Long exports keep a worker busy
+for their whole duration; with Gunicorn use threaded (gthread) workers,
+whose timeout does not cut off a running response.
+"""
+from __future__ import annotations
+
+import csv
+import enum
+import io
+import os
+import re
+import tempfile
+from datetime import datetime
+from typing import Iterator
+
+from flask import Response, current_app, stream_with_context
+from sqlalchemy import Select, select
+
+from . import db
+from .models import Requirement
+
+
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+EXPORT_COLUMNS = (
+    Requirement.id,
+    Requirement.department,
+    Requirement.customer_name,
+    Requirement.contact_info,
+    Requirement.details,
+    Requirement.staff_name,
+    Requirement.status,
+    Requirement.created_at,
+    Requirement.updated_at,
+)
+HEADERS = tuple(column.key for column in EXPORT_COLUMNS)
+
+FILE_CHUNK_SIZE = 64 * 1024
+# Spreadsheet apps run CSV cells starting with these as formulas; customer input must stay text.
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+# ...but a phone number such as +91 98480 22338 is harmless and should stay as typed.
+_NUMBER_RE = re.compile(r"^[+-]?[\d\s().-]+$")
+
+
+class ExportError(RuntimeError):
+    pass
+
+
+def export_select() -> Select:
+    """``SELECT`` of the exported columns; filter it and pass it to :func:`export_response`."""
+    return select(*EXPORT_COLUMNS)
+
+
+def _csv_cell(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES) and not _NUMBER_RE.match(value):
+        return "'" + value
+    return value
+
+
+def _rows(query: Select) -> Iterator[list]:
+    """Batches of result rows, fetched ``EXPORT_BATCH_SIZE`` at a time."""
+    ordered = query.order_by(Requirement.created_at.desc(), Requirement.id.desc())
+    batch_size = current_app.config["EXPORT_BATCH_SIZE"]
+    result = db.session.execute(ordered.execution_options(yield_per=batch_size))
+    yield from result.partitions()
+
+
+def _csv(query: Select) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(HEADERS)
+    for rows in _rows(query):
+        writer.writerows([_csv_cell(value) for value in row] for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _xlsx(query: Select) -> Iterator[bytes]:
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Requirements")
+
+    def cell(value):
+        if isinstance(value, enum.Enum):
+            return value.value
+        if isinstance(value, str) and value.startswith("="):
+            # openpyxl stores "=..." strings as formulas; force a plain string cell.
+            text = WriteOnlyCell(sheet, value)
+            text.data_type = "s"
+            return text
+        return value
+
+    sheet.append(HEADERS)
+    for rows in _rows(query):
+        for row in rows:
+            sheet.append([cell(value) for value in row])
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            workbook.save(fh)
+        with open(path, "rb") as fh:
+            while True:
+                chunk = fh.read(FILE_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.remove(path)
+
+
+def export_response(query: Select, fmt: str, name: str) -> Response:
+    """Stream ``query`` (from :func:`export_select`) as ``fmt``; raises ExportError for unusable formats."""
+    if fmt not in FORMATS:
+        raise ExportError(f"Unknown export format {fmt!r}")
+    if fmt == "xlsx":
+        try:
+            import openpyxl  # noqa: F401
+        except ImportError as exc:  # pragma: no cover - depends on deployment
+            raise ExportError("XLSX export requires the openpyxl package") from exc
+
+    body = _csv(query) if fmt == "csv" else _xlsx(query)
+    filename = f"{name}-{datetime.utcnow():%Y%m%d-%H%M}.{fmt}"
+    response = Response(stream_with_context(body), mimetype=FORMATS[fmt])
+    response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    response.headers["Cache-Control"] = "no-store"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
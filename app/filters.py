@@ -0,0 +1,78 @@
+"""Dashboard filters shared by the department, public and admin views."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List
+
+from flask import request
+from sqlalchemy import bindparam
+
+from . import search
+from .models import Requirement, RequirementStatus
+
+
+STATUS_FILTERS = {"open", "new", "in_progress", "fulfilled", "all"}
+OPEN_STATUSES = (RequirementStatus.NEW, RequirementStatus.IN_PROGRESS)
+
+
+def open_status_clause():
+    """``status IN ('NEW', 'IN_PROGRESS')`` with the values inlined into the SQL.
+
+    SQLite only uses the partial index ``ix_requirements_open_department_created_at_id``
+    when it can see that the query's condition implies the index's, which
+    it cannot through bound parameters.
+    """
+    values = bindparam("open_statuses", list(OPEN_STATUSES), expanding=True, literal_execute=True)
+    return Requirement.status.in_(values)
+
+
+@dataclass
+class RequirementFilters:
+    staff: str = ""  # Staff.id
+    customer: str = ""
+    status: str = "open"
+    q: str = ""
+
+    @classmethod
+    def from_request(cls) -> "RequirementFilters":
+        status = (request.args.get("status", "open") or "open").strip().lower()
+        return cls(
+            staff=request.args.get("staff", "").strip(),
+            customer=request.args.get("customer", "").strip(),
+            status=status if status in STATUS_FILTERS else "open",
+            q=request.args.get("q", "").strip(),
+        )
+
+    def clauses(self) -> List:
+        """WHERE clauses for ``select(Requirement)``; department scoping is left to the caller."""
+        clauses = []
+        if self.staff.isdigit():
+            clauses.append(Requirement.staff_id == int(self.staff))
+        elif self.staff:
+            # Links from before staff ids: exact name, still served by ix_requirements_staff_name.
+            clauses.append(Requirement.staff_name == self.staff)
+        if self.customer:
+            clauses.append(search.field_matches("customer_name", self.customer))
+        if self.q:
+            match = search.text_matches(self.q)
+            if match is not None:
+                clauses.append(match)
+        if self.status == "open":
+            clauses.append(open_status_clause())
+        elif self.status != "all":
+            clauses.append(Requirement.status == RequirementStatus(self.status.upper()))
+        return clauses
+
+    def query_args(self) -> dict:
+        """The filters as URL query arguments, for links that must keep them (exports, live updates)."""
+        args = {"staff": self.staff, "customer": self.customer, "status": self.status, "q": self.q}
+        return {name: value for name, value in args.items() if value}
+
+    def template_context(self) -> dict:
+        return {
+            "filter_staff": self.staff,
+            "filter_customer": self.customer,
+            "filter_status": self.status,
+            "filter_q": self.q,
+            "filter_args": self.query_args(),
+        }
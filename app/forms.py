@@ -1,9 +1,9 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, PasswordField, TextAreaField, SelectField, SubmitField
+from wtforms import StringField, PasswordField, TextAreaField, SelectField, SubmitField, HiddenField
 from wtforms.validators import DataRequired, Length
 from flask_wtf.file import FileField, FileAllowed
 
-from .models import RequirementStatus
+from .models import Department, RequirementStatus
 
 
 class LoginForm(FlaskForm):
@@ -17,6 +17,8 @@ class RequirementForm(FlaskForm):
     contact_info = StringField("Contact Info", validators=[DataRequired(), Length(max=120)])
     details = TextAreaField("Requirement Details", validators=[DataRequired(), Length(max=2000)])
     image = FileField("Product Image", validators=[FileAllowed(["png", "jpg", "jpeg", "gif", "webp"], "Images only!")])
+    # Set by the browser when the image was sent through the resumable upload endpoint instead
+    upload_id = HiddenField()
     staff_name = SelectField(
         "Staff Name",
         validators=[DataRequired()],
@@ -40,6 +42,15 @@ class UpdateStatusForm(FlaskForm):
         "Product Image (required when marking Fulfilled)",
         validators=[FileAllowed(["png", "jpg", "jpeg", "gif", "webp"], "Images only!")],
     )
+    upload_id = HiddenField()
     submit = SubmitField("Update")
 
 
+class StaffForm(FlaskForm):
+    department = SelectField(
+        "Department",
+        choices=[(dept.name, dept.value) for dept in Department],
+        validators=[DataRequired()],
+    )
+    name = StringField("Name", validators=[DataRequired(), Length(max=100)])
+    submit = SubmitField("Add Staff")
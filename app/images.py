@@ -0,0 +1,379 @@
+"""Product image uploads and their resized variants.
+
+Views call :func:`save_upload` to write the original, stripped of its EXIF,
+XMP and IPTC metadata (GPS position, camera serial numbers), and assign the
+returned name to ``Requirement.image_filename``. Once the transaction commits, every
+newly assigned original is handed to a small in-process thread pool which
+writes EXIF-free WebP variants next to it and records them on the
+requirement rows, moving ``updated_at`` so API sync cursors, live
+dashboards and the page cache pick up the thumbnails. Until that finishes the templates fall back to the
+original, so no resizing happens inside the request. The request does open
+the upload with Pillow to read its EXIF orientation, which parses headers
+only, and re-encodes the whole image just for a photo taken sideways.
+"""
+from __future__ import annotations
+
+import io
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from threading import Lock
+from typing import BinaryIO, Dict, Optional
+
+from flask import Flask, current_app
+from sqlalchemy import event, inspect, or_, update
+from sqlalchemy.orm import Session, object_session
+from werkzeug.datastructures import FileStorage
+from werkzeug.utils import secure_filename
+
+from . import db, uploads
+from .models import Requirement
+from .storage import get_storage
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+_PENDING_KEY = "images_pending_variants"
+SPOOL_MAX_SIZE = 1024 * 1024
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_pid: Optional[int] = None
+_executor_lock = Lock()
+
+
+def allowed_extension(filename: str) -> str:
+    """Lower-cased extension of ``filename`` if it is an allowed image type, else raise InvalidImage."""
+    original_name = secure_filename(filename or "")
+    ext = original_name.rsplit(".", 1)[-1].lower() if "." in original_name else ""
+    if ext not in current_app.config["ALLOWED_IMAGE_EXTENSIONS"]:
+        raise InvalidImage("Invalid image type.")
+    return ext
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Extension for the image format ``head`` (the first bytes of a file) starts with, if supported."""
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+# JPEG segments dropped from originals: APP1 (EXIF, XMP), APP13 (IPTC) and comments.
+# APP0 (JFIF), APP2 (ICC profile) and APP14 (Adobe colour transform) affect how pixels render and stay.
+JPEG_DROPPED_SEGMENTS = {0xE1, 0xED, 0xFE}
+PNG_DROPPED_CHUNKS = {b"eXIf", b"tEXt", b"iTXt", b"zTXt", b"tIME"}
+WEBP_DROPPED_CHUNKS = {b"EXIF", b"XMP "}
+GIF_XMP_APPLICATION = b"XMP DataXMP"  # application identifier and authentication code
+PIL_FORMATS = {"jpg": "JPEG", "png": "PNG", "webp": "WEBP"}
+EXIF_ORIENTATION = 0x0112
+
+
+def _read_exactly(src: BinaryIO, size: int) -> bytes:
+    data = src.read(size)
+    if len(data) != size:
+        raise InvalidImage("Image file is truncated.")
+    return data
+
+
+def _strip_jpeg(src: BinaryIO, out: BinaryIO) -> None:
+    out.write(_read_exactly(src, 2))
+    while True:
+        marker = _read_exactly(src, 2)
+        if marker[0] != 0xFF:
+            raise InvalidImage("Malformed JPEG file.")
+        while marker[1] == 0xFF:  # fill bytes
+            marker = b"\xff" + _read_exactly(src, 1)
+        code = marker[1]
+        if code in (0xDA, 0xD9):  # start of scan / end of image: the rest is image data
+            out.write(marker)
+            shutil.copyfileobj(src, out, uploads.CHUNK_SIZE)
+            return
+        if 0xD0 <= code <= 0xD7 or code == 0x01:  # markers without a length
+            out.write(marker)
+            continue
+        length = _read_exactly(src, 2)
+        body = _read_exactly(src, int.from_bytes(length, "big") - 2)
+        if code not in JPEG_DROPPED_SEGMENTS:
+            out.write(marker + length + body)
+
+
+def _strip_png(src: BinaryIO, out: BinaryIO) -> None:
+    out.write(_read_exactly(src, 8))
+    while True:
+        header = _read_exactly(src, 8)
+        chunk = _read_exactly(src, int.from_bytes(header[:4], "big") + 4)  # data + CRC
+        if header[4:8] not in PNG_DROPPED_CHUNKS:
+            out.write(header + chunk)
+        if header[4:8] == b"IEND":
+            return
+
+
+def _strip_webp(src: BinaryIO, out: BinaryIO) -> None:
+    out.write(_read_exactly(src, 12))
+    size = 4
+    while True:
+        header = src.read(8)
+        if not header:
+            break
+        if len(header) != 8:
+            raise InvalidImage("Image file is truncated.")
+        length = int.from_bytes(header[4:], "little")
+        payload = _read_exactly(src, length + length % 2)
+        if header[:4] in WEBP_DROPPED_CHUNKS:
+            continue
+        if header[:4] == b"VP8X":
+            payload = bytes([payload[0] & ~0x0C]) + payload[1:]  # clear the EXIF and XMP flags
+        out.write(header + payload)
+        size += 8 + len(payload)
+    out.seek(4)
+    out.write(size.to_bytes(4, "little"))
+    out.seek(0, os.SEEK_END)
+
+
+def _gif_sub_blocks(src: BinaryIO) -> bytes:
+    blocks = []
+    while True:
+        size = _read_exactly(src, 1)
+        blocks.append(size)
+        if size == b"\x00":
+            return b"".join(blocks)
+        blocks.append(_read_exactly(src, size[0]))
+
+
+def _strip_gif(src: BinaryIO, out: BinaryIO) -> None:
+    screen = _read_exactly(src, 13)  # header and logical screen descriptor
+    out.write(screen)
+    if screen[10] & 0x80:
+        out.write(_read_exactly(src, 3 << ((screen[10] & 0x07) + 1)))  # global colour table
+    while True:
+        introducer = _read_exactly(src, 1)
+        if introducer == b"\x3b":  # trailer
+            out.write(introducer)
+            return
+        if introducer == b"\x2c":  # image: descriptor, local colour table, LZW code size, data
+            descriptor = _read_exactly(src, 9)
+            table = _read_exactly(src, 3 << ((descriptor[8] & 0x07) + 1)) if descriptor[8] & 0x80 else b""
+            out.write(introducer + descriptor + table + _read_exactly(src, 1) + _gif_sub_blocks(src))
+        elif introducer == b"\x21":
+            label = _read_exactly(src, 1)
+            body = _gif_sub_blocks(src)
+            if label == b"\xfe" or label == b"\xff" and body[1:12] == GIF_XMP_APPLICATION:
+                continue
+            out.write(introducer + label + body)
+        else:
+            raise InvalidImage("Malformed GIF file.")
+
+
+def _orientation(stream: BinaryIO) -> int:
+    from PIL import Image
+
+    try:
+        with Image.open(stream) as image:
+            return image.getexif().get(EXIF_ORIENTATION, 1)
+    except Exception:
+        return 1  # unreadable metadata is dropped below either way
+    finally:
+        stream.seek(0)
+
+
+def _reencode_upright(stream: BinaryIO, ext: str, out: BinaryIO) -> None:
+    from PIL import Image, ImageOps
+
+    try:
+        with Image.open(stream) as source:
+            icc_profile = source.info.get("icc_profile")
+            image = ImageOps.exif_transpose(source)
+            options = {"quality": 95} if ext in ("jpg", "webp") else {}
+            if icc_profile:
+                options["icc_profile"] = icc_profile
+            image.save(out, PIL_FORMATS[ext], **options)
+    except Exception as exc:  # Pillow raises OSError, ValueError or DecompressionBombError
+        raise InvalidImage("Image file could not be read.") from exc
+
+
+def strip_metadata(stream: BinaryIO, ext: str) -> BinaryIO:
+    """Copy of the image in ``stream`` without EXIF/XMP/IPTC metadata (GPS position, camera, owner).
+
+    Segments are dropped without re-encoding, so pixels and file hashes stay
+    stable. A photo whose EXIF orientation is not upright is re-encoded with
+    the rotation applied instead, since dropping the tag would turn it.
+    GIFs lose their comment and XMP extensions; other application extensions
+    (animation looping, ICC profiles) are kept.
+    """
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    if ext in PIL_FORMATS and _orientation(stream) != 1:
+        _reencode_upright(stream, ext, out)
+    elif ext == "jpg":
+        _strip_jpeg(stream, out)
+    elif ext == "png":
+        _strip_png(stream, out)
+    elif ext == "webp":
+        _strip_webp(stream, out)
+    elif ext == "gif":
+        _strip_gif(stream, out)
+    else:
+        shutil.copyfileobj(stream, out, uploads.CHUNK_SIZE)
+    out.seek(0)
+    return out
+
+
+def has_upload(image_file: Optional[FileStorage]) -> bool:
+    return bool(image_file and getattr(image_file, "filename", ""))
+
+
+def save_upload(image_file: FileStorage) -> str:
+    """Store an uploaded image and return the key to keep in ``image_filename``.
+
+    The stored extension comes from the file's magic bytes, not its name;
+    metadata is removed first (:func:`strip_metadata`).
+    """
+    allowed_extension(image_file.filename)
+    stream = image_file.stream
+    ext = sniff_image_type(stream.read(16))
+    if ext is None:
+        raise InvalidImage("Invalid image type.")
+    stream.seek(0)
+    with strip_metadata(stream, ext) as clean:
+        return uploads.store(clean, ext)
+
+
+def image_from_form(image_file: Optional[FileStorage], upload_id: Optional[str]) -> Optional[str]:
+    """Key of the image a form submitted, either as a file or as a completed chunked upload."""
+    from . import chunked  # chunked depends on this module
+
+    if upload_id:
+        try:
+            return chunked.completed_key(upload_id)
+        except chunked.UploadError as exc:
+            raise InvalidImage(str(exc)) from exc
+    if has_upload(image_file):
+        return save_upload(image_file)
+    return None
+
+
+def variant_name(filename: str, variant: str) -> str:
+    stem = filename.rsplit(".", 1)[0]
+    return f"{stem}_{variant}.webp"
+
+
+def generate_variants(app: Flask, filename: str) -> Dict[str, str]:
+    """Write every configured variant of ``filename``; returns ``{variant: stored name}``."""
+    from PIL import Image, ImageOps  # deferred: only the worker threads need Pillow
+
+    storage = get_storage()
+    sizes = {"thumb": app.config["IMAGE_THUMB_SIZE"], "medium": app.config["IMAGE_MEDIUM_SIZE"]}
+    written = {variant: variant_name(filename, variant) for variant in sizes}
+    if all(storage.exists(name) for name in written.values()):
+        return written  # same content was uploaded before
+    with storage.open(filename) as fh, Image.open(fh) as source:
+        # Bake the EXIF orientation into the pixels; the variants are saved without any EXIF block.
+        image = ImageOps.exif_transpose(source)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA")
+        for variant, size in sizes.items():
+            resized = image.copy()
+            resized.thumbnail((size, size), Image.Resampling.LANCZOS)
+            buffer = io.BytesIO()
+            resized.save(buffer, "WEBP", quality=app.config["IMAGE_WEBP_QUALITY"], method=4)
+            buffer.seek(0)
+            storage.put(written[variant], buffer)
+    return written
+
+
+def _process(app: Flask, filename: str) -> None:
+    with app.app_context():
+        try:
+            variants = generate_variants(app, filename)
+        except Exception:
+            app.logger.exception("Could not generate image variants for %s", filename)
+            return
+        try:
+            db.session.execute(
+                update(Requirement)
+                .where(
+                    Requirement.image_filename == filename,
+                    or_(
+                        Requirement.image_thumb_filename.is_distinct_from(variants["thumb"]),
+                        Requirement.image_medium_filename.is_distinct_from(variants["medium"]),
+                    ),
+                )
+                .values(
+                    image_thumb_filename=variants["thumb"],
+                    image_medium_filename=variants["medium"],
+                    # A visible change: API cursors, live streams and the page cache key on updated_at.
+                    updated_at=datetime.utcnow(),
+                )
+            )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            app.logger.exception("Could not record image variants for %s", filename)
+        finally:
+            db.session.remove()
+
+
+def _get_executor(app: Flask) -> ThreadPoolExecutor:
+    global _executor, _executor_pid
+    with _executor_lock:
+        # Gunicorn forks workers after import; each process needs its own pool.
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=app.config["IMAGE_WORKERS"], thread_name_prefix="image-variants"
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def schedule_variants(filename: str) -> None:
+    app = current_app._get_current_object()
+    if app.config["IMAGE_PROCESSING_SYNC"]:
+        _process(app, filename)
+    else:
+        _get_executor(app).submit(_process, app, filename)
+
+
+@event.listens_for(Requirement.image_filename, "set")
+def _reset_variants(target, value, oldvalue, initiator):
+    if value != oldvalue:
+        target.image_thumb_filename = None
+        target.image_medium_filename = None
+
+
+def _queue_if_new_image(target: Requirement) -> None:
+    history = inspect(target).attrs.image_filename.history
+    if target.image_filename and history.added:
+        session = object_session(target)
+        if session is not None:
+            session.info.setdefault(_PENDING_KEY, set()).add(target.image_filename)
+
+
+@event.listens_for(Requirement, "after_insert")
+def _after_insert(mapper, connection, target):
+    _queue_if_new_image(target)
+
+
+@event.listens_for(Requirement, "after_update")
+def _after_update(mapper, connection, target):
+    _queue_if_new_image(target)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        for filename in pending:
+            schedule_variants(filename)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _after_rollback(session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
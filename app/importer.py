@@ -0,0 +1,257 @@
+"""Bulk import of requirements from CSV or XLSX (``flask import-requirements``).
+
+Rows are read one at a time (``csv`` / openpyxl's read-only mode) and
+checked with ``RequirementForm``, the same rules as the create pages:
+required customer, contact and details within their length limits, and a
+staff name that is on the department's roster. Accepted rows are inserted
+in batches, one ``executemany`` and one transaction per batch. Rejected
+rows go to a CSV next to the input with the reason, ready to be fixed and
+imported again.
+
+The inserts bypass the ORM, so what the mapper events would do per row is
+done per batch here: ``staff_id`` from the roster, the search index and
+the status counters.
+
+Recognised columns (header names are case-insensitive): ``customer_name``
+(or ``customer``), ``contact_info`` (``contact``), ``details``,
+``staff_name`` (``staff``), ``department`` (``dept``), ``status`` and
+``created_at`` (``date``). Other columns are ignored.
+"""
+from __future__ import annotations
+
+import csv
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import select
+from werkzeug.datastructures import MultiDict
+
+from . import db, roster, search, stats
+from .forms import RequirementForm
+from .models import Department, Requirement, RequirementStatus, User
+
+
+requirements_table = Requirement.__table__
+
+ALIASES = {
+    "customer": "customer_name",
+    "contact": "contact_info",
+    "staff": "staff_name",
+    "dept": "department",
+    "date": "created_at",
+}
+REJECT_COLUMNS = ("customer_name", "contact_info", "details", "staff_name", "department", "status", "created_at")
+DATE_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d", "%d/%m/%Y %H:%M", "%d/%m/%Y")
+
+
+class ImportFileError(RuntimeError):
+    pass
+
+
+class RowRejected(ValueError):
+    pass
+
+
+@dataclass
+class ImportResult:
+    read: int = 0
+    imported: int = 0
+    rejected: int = 0
+
+
+def _column(header) -> str:
+    name = str(header or "").strip().lower().replace(" ", "_")
+    return ALIASES.get(name, name)
+
+
+def _read_csv(path: str) -> Iterator[Dict[str, str]]:
+    with open(path, newline="", encoding="utf-8-sig") as fh:
+        reader = csv.reader(fh)
+        headers = [_column(header) for header in next(reader, [])]
+        for values in reader:
+            if any(value.strip() for value in values):
+                yield dict(zip(headers, values))
+
+
+def _read_xlsx(path: str) -> Iterator[Dict[str, str]]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError as exc:  # pragma: no cover - depends on deployment
+        raise ImportFileError("Importing .xlsx files requires the openpyxl package") from exc
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        headers = [_column(header) for header in next(rows, ())]
+        for values in rows:
+            if any(value not in (None, "") for value in values):
+                yield {header: value for header, value in zip(headers, values)}
+    finally:
+        workbook.close()
+
+
+def read_rows(path: str) -> Iterator[Dict[str, str]]:
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return _read_csv(path)
+    if extension in (".xlsx", ".xlsm"):
+        return _read_xlsx(path)
+    raise ImportFileError(f"Unsupported file type {extension!r}; use .csv or .xlsx")
+
+
+def _text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    return str(value).strip()
+
+
+def _department(value: str, default: Optional[Department]) -> Department:
+    if not value:
+        if default is None:
+            raise RowRejected("missing department")
+        return default
+    for department in Department:
+        if value.upper() in (department.name, department.value.upper()):
+            return department
+    raise RowRejected(f"unknown department {value!r}")
+
+
+def _status(value: str) -> RequirementStatus:
+    if not value:
+        return RequirementStatus.NEW
+    key = value.upper().replace(" ", "_")
+    try:
+        return RequirementStatus[key]
+    except KeyError:
+        raise RowRejected(f"unknown status {value!r}")
+
+
+def _naive_utc(value: datetime) -> datetime:
+    # created_at holds naive UTC; SQLite would store an aware value with its offset silently dropped.
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _created_at(value, now: datetime) -> datetime:
+    if value in (None, ""):
+        return now
+    if isinstance(value, datetime):
+        return _naive_utc(value)
+    text = str(value).strip()
+    try:
+        return _naive_utc(datetime.fromisoformat(text))
+    except ValueError:
+        pass
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    raise RowRejected(f"unrecognised date {text!r}")
+
+
+def insert_batch(rows: List[dict]) -> None:
+    """Insert complete ``requirements`` rows in one transaction, with their search index and counters.
+
+    Each dict gets its new ``id``. Also used by ``flask gen-data``.
+    """
+    with db.engine.begin() as connection:
+        ids = connection.execute(
+            requirements_table.insert().returning(requirements_table.c.id, sort_by_parameter_order=True),
+            rows,
+        ).scalars().all()
+        for row, new_id in zip(rows, ids):
+            row["id"] = new_id
+        search.index_rows(connection, rows)
+        stats.apply_deltas(connection, stats.count_rows((row["department"], row["status"]) for row in rows))
+
+
+class Importer:
+    def __init__(self, created_by: User, department: Optional[Department] = None, batch_size: int = 1000):
+        self.created_by_id = created_by.id
+        self.department = department
+        self.batch_size = batch_size
+        # department -> lower-cased name -> (staff id, name as on the roster); includes inactive staff
+        self.staff: Dict[Department, Dict[str, Tuple[int, str]]] = {
+            dept: {member.name.lower(): (member.id, member.name) for member in roster.members(dept)}
+            for dept in Department
+        }
+        # One form, re-filled per row: building a form costs more than validating one.
+        self.form = RequirementForm(formdata=None, meta={"csrf": False})
+        self.choices = {
+            dept: [("", "")] + [(name, name) for _, name in members.values()] for dept, members in self.staff.items()
+        }
+
+    def build(self, raw: Dict[str, object], now: datetime) -> dict:
+        """The ``requirements`` row for one input row; raises :class:`RowRejected`."""
+        department = _department(_text(raw.get("department")), self.department)
+        staff_id, staff_name = self.staff[department].get(_text(raw.get("staff_name")).lower(), (None, ""))
+
+        fields = {name: _text(raw.get(name)) for name in ("customer_name", "contact_info", "details")}
+        form = self.form
+        form.process(MultiDict({**fields, "staff_name": staff_name}))
+        form.staff_name.choices = self.choices[department]
+        if not form.validate():
+            if form.staff_name.errors and not staff_name:
+                raise RowRejected(f"unknown staff {_text(raw.get('staff_name'))!r} for {department.value}")
+            raise RowRejected(
+                "; ".join(f"{name}: {' '.join(errors)}" for name, errors in form.errors.items())
+            )
+
+        return {
+            **fields,
+            "department": department,
+            "staff_name": staff_name,
+            "staff_id": staff_id,
+            "status": _status(_text(raw.get("status"))),
+            "created_at": _created_at(raw.get("created_at"), now),
+            "updated_at": now,
+            "created_by_id": self.created_by_id,
+        }
+
+    def run(
+        self,
+        rows: Iterator[Dict[str, object]],
+        rejects: Optional[csv.writer] = None,
+        dry_run: bool = False,
+        progress: Optional[Callable[[ImportResult], None]] = None,
+    ) -> ImportResult:
+        result = ImportResult()
+        batch: List[dict] = []
+        now = datetime.utcnow()
+
+        def flush():
+            if batch and not dry_run:
+                insert_batch(batch)
+            result.imported += len(batch)
+            batch.clear()
+            if progress is not None:
+                progress(result)
+
+        for raw in rows:
+            result.read += 1
+            try:
+                batch.append(self.build(raw, now))
+            except RowRejected as exc:
+                result.rejected += 1
+                if rejects is not None:
+                    rejects.writerow([result.read + 1] + [_text(raw.get(name)) for name in REJECT_COLUMNS] + [str(exc)])
+            if len(batch) >= self.batch_size:
+                flush()
+        flush()
+        return result
+
+
+def reject_writer(fh) -> csv.writer:
+    writer = csv.writer(fh)
+    writer.writerow(("line",) + REJECT_COLUMNS + ("error",))
+    return writer
+
+
+def find_user(username: str) -> Optional[User]:
+    return db.session.execute(select(User).where(User.username == username)).scalar_one_or_none()
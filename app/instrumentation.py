@@ -0,0 +1,134 @@
+"""Per-request SQL accounting: query counts, database time and slow statements.
+
+Cursor events on every engine record, for the request being handled, how
+many statements it ran and how long the database took. Each response then
+carries a ``Server-Timing`` header (``db`` and ``app`` durations, visible
+in the browser's network panel) and, with ``REQUEST_LOG_ENABLED``, one
+structured log line::
+
+    request method=GET endpoint=requirements.dashboard status=200 duration_ms=6.1 queries=2 db_ms=1.4
+
+Statements slower than ``SLOW_QUERY_MS`` are logged as warnings with the
+endpoint that issued them.
+
+Views get a query budget: ``QUERY_BUDGET`` statements by default, or what
+:func:`query_budget` sets on the view. Going over it is logged; with
+``QUERY_BUDGET_ENFORCE`` (``flask bench`` turns it on) the statement that
+crosses the budget raises :class:`QueryBudgetExceeded` instead, so the
+traceback points at the N+1, typically a lazy ``created_by`` or
+``assigned_to`` load in a loop. Work outside a request (CLI commands,
+image workers) is not counted.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple
+
+from flask import Flask, current_app, g, has_request_context, request
+from sqlalchemy import event
+
+from . import db
+
+
+SLOW_STATEMENT_CHARS = 500
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+@dataclass
+class RequestStats:
+    started: float
+    budget: int
+    queries: int = 0
+    db_seconds: float = 0.0
+    slow: List[Tuple[float, str]] = field(default_factory=list)
+
+
+def query_budget(limit: int) -> Callable:
+    """Allow a view at most ``limit`` SQL statements per request (place it under ``@route``)."""
+
+    def decorator(view):
+        view.query_budget = limit
+        return view
+
+    return decorator
+
+
+def init_app(app: Flask) -> None:
+    if not app.config["INSTRUMENTATION_ENABLED"]:
+        return
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    if app.config["REQUEST_LOG_ENABLED"] and app.logger.level == logging.NOTSET:
+        app.logger.setLevel(logging.INFO)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+
+
+def current_stats() -> Optional[RequestStats]:
+    if not has_request_context():
+        return None
+    return g.get("_request_stats")
+
+
+def _budget() -> int:
+    view = current_app.view_functions.get(request.endpoint)
+    return getattr(view, "query_budget", current_app.config["QUERY_BUDGET"])
+
+
+def _start_request() -> None:
+    g._request_stats = RequestStats(started=time.perf_counter(), budget=_budget())
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_stats()
+    if stats is None:
+        return
+    stats.queries += 1
+    if stats.budget and stats.queries > stats.budget and current_app.config["QUERY_BUDGET_ENFORCE"]:
+        raise QueryBudgetExceeded(
+            f"{request.endpoint} ran more than {stats.budget} queries; statement {stats.queries}: {statement}"
+        )
+    context._instrument_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_stats()
+    started = getattr(context, "_instrument_started", None)
+    if stats is None or started is None:
+        return
+    elapsed = time.perf_counter() - started
+    stats.db_seconds += elapsed
+    if elapsed * 1000 >= current_app.config["SLOW_QUERY_MS"]:
+        text = " ".join(statement.split())[:SLOW_STATEMENT_CHARS]
+        stats.slow.append((elapsed, text))
+        current_app.logger.warning("Slow query (%.1f ms) in %s: %s", elapsed * 1000, request.endpoint, text)
+
+
+def _finish_request(response):
+    stats = current_stats()
+    if stats is None:
+        return response
+    duration = time.perf_counter() - stats.started
+    if current_app.config["SERVER_TIMING_ENABLED"]:
+        response.headers.add(
+            "Server-Timing",
+            f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries", app;dur={duration * 1000:.1f}',
+        )
+    if stats.budget and stats.queries > stats.budget:
+        current_app.logger.warning(
+            "Query budget exceeded in %s: %d queries, budget %d", request.endpoint, stats.queries, stats.budget
+        )
+    if current_app.config["REQUEST_LOG_ENABLED"]:
+        current_app.logger.info(
+            "request method=%s endpoint=%s status=%d duration_ms=%.1f queries=%d db_ms=%.1f slow=%d",
+            request.method, request.endpoint, response.status_code, duration * 1000,
+            stats.queries, stats.db_seconds * 1000, len(stats.slow),
+        )
+    return response
@@ -0,0 +1,332 @@
+"""Live dashboard updates over Server-Sent Events.
+
+A dashboard opens ``EventSource`` on its department's stream and patches
+the table from the events instead of reloading the whole list:
+
+``row``     ``{"id", "created", "html"}``: insert or replace the row
+``remove``  ``{"id"}``: the row was deleted, moved or no longer matches the filters
+``counts``  ``{status: total}``: the status badges
+``resync``  too much changed at once; reload the page
+
+Commits publish the ids they touched on an in-process bus, which wakes
+this process's streams for that department at once. Either way a stream
+then asks the database what changed: rows of the department with
+``updated_at`` at or after its cursor (``ix_requirements_department_updated_at_id``)
+and the status counters. The same query runs every ``LIVE_POLL_INTERVAL``
+seconds, which is how changes made by other processes arrive. Deletes and
+moves to another department leave no row to find, so when the counters
+change the stream also checks which of the rows it knows still exist.
+
+Each open stream holds a worker thread, so this needs threaded (gthread)
+or async workers and is off unless ``LIVE_UPDATES_ENABLED`` is set: under
+sync workers a few open dashboards would occupy every worker.
+``LIVE_MAX_STREAMS`` caps streams per process and streams end after
+``LIVE_STREAM_SECONDS``, after which the client reconnects.
+"""
+from __future__ import annotations
+
+import json
+import queue
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from threading import BoundedSemaphore, Lock
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+from flask import Response, current_app, get_template_attribute, request, stream_with_context, url_for
+from flask_login import current_user
+from sqlalchemy import and_, case, event, inspect, select, true
+from sqlalchemy.orm import Session, object_session
+
+from . import db, stats
+from .filters import RequirementFilters
+from .models import Department, Requirement
+from .pagination import LIST_COLUMNS
+
+
+# Rows per poll; a burst larger than this (an import, say) makes the client reload instead.
+MAX_ROWS_PER_POLL = 200
+# Ids a stream keeps checking for deletion; a page shows at most REQUIREMENTS_MAX_PAGE_SIZE rows.
+MAX_KNOWN_IDS = 500
+
+_CHANGES_KEY = "live_changes"
+
+
+class StreamLimitReached(RuntimeError):
+    pass
+
+
+class _Bus:
+    """Per-process fan-out of ``(kind, id)`` change notices to the streams of a department."""
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._subscribers: Dict[Department, Set["queue.Queue"]] = defaultdict(set)
+
+    @contextmanager
+    def subscribe(self, department: Department) -> Iterator["queue.Queue"]:
+        inbox: "queue.Queue" = queue.Queue(maxsize=256)
+        with self._lock:
+            self._subscribers[department].add(inbox)
+        try:
+            yield inbox
+        finally:
+            with self._lock:
+                self._subscribers[department].discard(inbox)
+
+    def publish(self, department: Department, notices: Iterable[tuple]) -> None:
+        with self._lock:
+            inboxes = list(self._subscribers.get(department, ()))
+        for inbox in inboxes:
+            for notice in notices:
+                try:
+                    inbox.put_nowait(notice)
+                except queue.Full:
+                    break  # the stream is behind; its next poll catches up anyway
+
+
+bus = _Bus()
+
+_slots: Optional[BoundedSemaphore] = None
+_slots_lock = Lock()
+
+
+def _stream_slots() -> BoundedSemaphore:
+    global _slots
+    with _slots_lock:
+        if _slots is None:
+            _slots = BoundedSemaphore(current_app.config["LIVE_MAX_STREAMS"])
+        return _slots
+
+
+def reserve_stream() -> BoundedSemaphore:
+    """Take one of this process's stream slots; the caller must ``release()`` it."""
+    slots = _stream_slots()
+    if not slots.acquire(blocking=False):
+        raise StreamLimitReached("too many open live streams")
+    return slots
+
+
+def parse_cursor(raw: Optional[str]) -> datetime:
+    try:
+        cursor = datetime.fromisoformat(raw) if raw else None
+    except ValueError:
+        cursor = None
+    if cursor is None:
+        return datetime.utcnow()
+    if cursor.tzinfo is not None:
+        # Stored timestamps are naive UTC; an aware cursor could not be compared with them.
+        cursor = cursor.astimezone(timezone.utc).replace(tzinfo=None)
+    return cursor
+
+
+def parse_ids(raw: Optional[str]) -> Set[int]:
+    ids = {int(part) for part in (raw or "").split(",") if part.strip().isdigit()}
+    return set(sorted(ids)[-MAX_KNOWN_IDS:])
+
+
+def _sse(event_name: str, data, event_id: Optional[str] = None) -> str:
+    lines = [f"event: {event_name}"]
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append("data: " + json.dumps(data, separators=(",", ":")))
+    return "\n".join(lines) + "\n\n"
+
+
+class DepartmentStream:
+    """State of one client's stream: filters, cursor and the rows it has been told about."""
+
+    def __init__(
+        self,
+        department: Department,
+        filters: RequirementFilters,
+        cursor: datetime,
+        known_ids: Set[int],
+        public_view: bool,
+        admin_links: bool,
+    ):
+        self.department = department
+        self.filters = filters
+        self.cursor = cursor
+        self.known_ids = set(known_ids)
+        self.public_view = public_view
+        self.admin_links = admin_links
+        self.counts: Optional[Dict[str, int]] = None
+        # (id -> updated_at) already sent inside the lookback window, so re-reading it sends nothing
+        self._sent: Dict[int, datetime] = {}
+        self._row = get_template_attribute("requirements/_row.html", "requirement_row")
+
+    def _render(self, row) -> str:
+        return str(self._row(row, self.public_view, self.department.name, self.admin_links))
+
+    def _remove(self, item_id: int) -> Optional[str]:
+        if item_id not in self.known_ids:
+            return None
+        self.known_ids.discard(item_id)
+        return _sse("remove", {"id": item_id})
+
+    def removed(self, ids: Iterable[int]) -> List[str]:
+        return [message for message in (self._remove(item_id) for item_id in ids) if message]
+
+    def poll(self) -> List[str]:
+        messages: List[str] = []
+        lookback = timedelta(seconds=current_app.config["LIVE_LOOKBACK_SECONDS"])
+        matches = case((and_(true(), *self.filters.clauses()), True), else_=False).label("matches")
+        rows = db.session.execute(
+            select(*LIST_COLUMNS, Requirement.updated_at, matches)
+            .where(Requirement.department == self.department, Requirement.updated_at >= self.cursor - lookback)
+            .order_by(Requirement.updated_at, Requirement.id)
+            .limit(MAX_ROWS_PER_POLL + 1)
+        ).all()
+        if len(rows) > MAX_ROWS_PER_POLL:
+            return [_sse("resync", {})]
+
+        for row in rows:
+            self.cursor = max(self.cursor, row.updated_at)
+            if self._sent.get(row.id) == row.updated_at:
+                continue
+            self._sent[row.id] = row.updated_at
+            if row.matches:
+                if len(self.known_ids) < MAX_KNOWN_IDS:
+                    self.known_ids.add(row.id)
+                messages.append(
+                    _sse(
+                        "row",
+                        {"id": row.id, "created": row.created_at.isoformat(), "html": self._render(row)},
+                        event_id=self.cursor.isoformat(),
+                    )
+                )
+            else:
+                message = self._remove(row.id)
+                if message:
+                    messages.append(message)
+        horizon = self.cursor - lookback
+        self._sent = {item_id: at for item_id, at in self._sent.items() if at >= horizon}
+
+        counts = {status.name: total for status, total in stats.department_counts(self.department).items()}
+        if counts != self.counts:
+            if self.counts is not None and self.known_ids:
+                # Something was deleted or moved elsewhere, possibly by another process.
+                still_here = set(
+                    db.session.execute(
+                        select(Requirement.id).where(
+                            Requirement.id.in_(self.known_ids), Requirement.department == self.department
+                        )
+                    ).scalars()
+                )
+                messages.extend(self.removed(self.known_ids - still_here))
+            self.counts = counts
+            messages.append(_sse("counts", counts))
+        return messages
+
+    def events(self, inbox: "queue.Queue") -> Iterator[str]:
+        config = current_app.config
+        deadline = time.monotonic() + config["LIVE_STREAM_SECONDS"]
+        yield f"retry: {int(config['LIVE_POLL_INTERVAL'] * 1000)}\n\n"
+        while time.monotonic() < deadline:
+            messages = self.poll()
+            # Give the connection back between polls; a stream may stay open for minutes.
+            db.session.remove()
+            yield "".join(messages) if messages else ": keepalive\n\n"
+            try:
+                notice = inbox.get(timeout=config["LIVE_POLL_INTERVAL"])
+            except queue.Empty:
+                continue
+            deleted = []
+            while True:
+                kind, item_id = notice
+                if kind == "deleted":
+                    deleted.append(item_id)
+                try:
+                    notice = inbox.get_nowait()
+                except queue.Empty:
+                    break
+            if deleted:
+                removals = self.removed(deleted)
+                if removals:
+                    yield "".join(removals)
+        yield _sse("reconnect", {"cursor": self.cursor.isoformat()})
+
+
+def template_context(endpoint: str, page, **values) -> dict:
+    """What ``requirements/_live.html`` needs for a dashboard page; no ``live_url`` when disabled."""
+    if not current_app.config["LIVE_UPDATES_ENABLED"]:
+        return {"live_url": None}
+    return {
+        "live_url": url_for(endpoint, **values, **RequirementFilters.from_request().query_args()),
+        "live_cursor": datetime.utcnow().isoformat(),
+        "live_prepend": not page.has_prev,
+        "live_append": not page.has_next,
+    }
+
+
+def stream_response(department: Department, public_view: bool) -> Response:
+    """The ``text/event-stream`` response for one dashboard of ``department``."""
+    if not current_app.config["LIVE_UPDATES_ENABLED"]:
+        return Response(status=404)
+    try:
+        slots = reserve_stream()
+    except StreamLimitReached:
+        return Response(status=503, headers={"Retry-After": str(current_app.config["LIVE_STREAM_SECONDS"])})
+
+    stream = DepartmentStream(
+        department,
+        RequirementFilters.from_request(),
+        parse_cursor(request.args.get("cursor")),
+        parse_ids(request.args.get("ids")),
+        public_view=public_view,
+        admin_links=public_view and current_user.is_authenticated and current_user.is_admin,
+    )
+
+    def generate() -> Iterator[str]:
+        with bus.subscribe(department) as inbox:
+            yield from stream.events(inbox)
+
+    response = Response(stream_with_context(generate()), mimetype="text/event-stream")
+    response.call_on_close(slots.release)
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # let Nginx pass events through as they are written
+    return response
+
+
+def _note(target: Requirement, department: Optional[Department], kind: str) -> None:
+    session = object_session(target)
+    if session is not None and department is not None:
+        session.info.setdefault(_CHANGES_KEY, []).append((department, kind, target.id))
+
+
+@event.listens_for(Requirement, "after_insert")
+def _after_insert(mapper, connection, target):
+    _note(target, target.department, "created")
+
+
+@event.listens_for(Requirement, "after_update")
+def _after_update(mapper, connection, target):
+    history = inspect(target).attrs.department.history
+    for previous in history.deleted or ():
+        if previous != target.department:
+            _note(target, previous, "deleted")
+    _note(target, target.department, "updated")
+
+
+@event.listens_for(Requirement, "after_delete")
+def _after_delete(mapper, connection, target):
+    _note(target, target.department, "deleted")
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    changes = session.info.pop(_CHANGES_KEY, None)
+    if not changes:
+        return
+    by_department: Dict[Department, List[tuple]] = defaultdict(list)
+    for department, kind, item_id in changes:
+        by_department[department].append((kind, item_id))
+    for department, notices in by_department.items():
+        bus.publish(department, notices)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _after_rollback(session, previous_transaction):
+    session.info.pop(_CHANGES_KEY, None)
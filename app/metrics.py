@@ -0,0 +1,198 @@
+"""Prometheus metrics at ``/metrics`` (``METRICS_ENABLED``; needs ``prometheus-client``).
+
+Exported series:
+
+* ``http_request_duration_seconds{endpoint,method,status}`` - time to the
+  response (for streams: to the first byte), per view endpoint;
+* ``http_requests_in_progress`` - requests being handled, open live
+  streams and exports included;
+* ``http_request_db_queries{endpoint}`` - SQL statements per request;
+* ``db_pool_checkout_seconds`` - time spent waiting for a pooled
+  connection (grows when the pool is too small for the worker's threads);
+* ``upload_size_bytes`` / ``upload_duration_seconds`` - stored uploads,
+  including copying them to the storage backend;
+* ``password_verify_seconds{scheme}`` - bcrypt / argon2 checks at login;
+* ``requirements{department,status}`` - current totals, read from the
+  status counters when scraped.
+
+Under Gunicorn every worker keeps its own values. Point
+``PROMETHEUS_MULTIPROC_DIR`` at an empty directory (cleared before each
+start) in the environment of the master process; workers then write their
+samples there and any worker's ``/metrics`` reports the sum over all of
+them. Add ``child_exit`` to the Gunicorn config so gauges of exited
+workers are dropped::
+
+    def child_exit(server, worker):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+
+With ``METRICS_TOKEN`` set, scrapes must send ``Authorization: Bearer
+<token>``; otherwise restrict ``/metrics`` at the proxy.
+"""
+from __future__ import annotations
+
+import hmac
+import os
+import time
+from typing import Dict, Optional
+
+from flask import Flask, Response, abort, current_app, g, request
+from sqlalchemy.pool import Pool
+
+from . import db
+from .instrumentation import current_stats
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55)
+UPLOAD_SIZE_BUCKETS = (16e3, 64e3, 256e3, 1e6, 2e6, 5e6, 10e6, 25e6)
+
+# Created once per process on first init_app; None while metrics are off.
+_metrics: Optional[Dict[str, object]] = None
+_timed_pools: Dict[type, type] = {}
+
+
+def _create_metrics() -> Dict[str, object]:
+    from prometheus_client import Gauge, Histogram
+
+    return {
+        "latency": Histogram(
+            "http_request_duration_seconds", "Time to respond, per view endpoint",
+            ("endpoint", "method", "status"), buckets=LATENCY_BUCKETS,
+        ),
+        "in_progress": Gauge(
+            "http_requests_in_progress", "Requests currently being handled", multiprocess_mode="livesum"
+        ),
+        "queries": Histogram(
+            "http_request_db_queries", "SQL statements per request", ("endpoint",), buckets=QUERY_BUCKETS
+        ),
+        "pool_wait": Histogram(
+            "db_pool_checkout_seconds", "Time waiting for a database connection from the pool",
+            buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+        ),
+        "upload_size": Histogram("upload_size_bytes", "Size of stored uploads", buckets=UPLOAD_SIZE_BUCKETS),
+        "upload_duration": Histogram(
+            "upload_duration_seconds", "Time to hash and store an upload", buckets=LATENCY_BUCKETS
+        ),
+        "password_verify": Histogram(
+            "password_verify_seconds", "Time to check a password against its hash", ("scheme",),
+            buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+        ),
+    }
+
+
+def init_app(app: Flask) -> None:
+    global _metrics
+    if not app.config["METRICS_ENABLED"]:
+        return
+    try:
+        import prometheus_client  # noqa: F401
+    except ImportError as exc:  # pragma: no cover - depends on deployment
+        raise RuntimeError("METRICS_ENABLED requires the prometheus-client package") from exc
+
+    if _metrics is None:
+        _metrics = _create_metrics()
+    with app.app_context():
+        for engine in db.engines.values():
+            _time_checkouts(engine.pool)
+    app.before_request(_start_request)
+    app.after_request(_record_request)
+    app.teardown_request(_end_request)
+    app.add_url_rule("/metrics", "metrics", metrics_view)
+
+
+def _timed_pool_class(base: type) -> type:
+    if base not in _timed_pools:
+
+        def _do_get(self):
+            started = time.perf_counter()
+            try:
+                return base._do_get(self)
+            finally:
+                if _metrics is not None:
+                    _metrics["pool_wait"].observe(time.perf_counter() - started)
+
+        _timed_pools[base] = type(f"Timed{base.__name__}", (base,), {"_do_get": _do_get})
+    return _timed_pools[base]
+
+
+def _time_checkouts(pool: Pool) -> None:
+    # SQLAlchemy has no event before a checkout, so the pool's class is swapped for a subclass
+    # that times it; Pool.recreate() (engine.dispose()) builds the same subclass again.
+    if type(pool) not in _timed_pools.values():
+        pool.__class__ = _timed_pool_class(type(pool))
+
+
+def _start_request() -> None:
+    g._metrics_started = time.perf_counter()
+    _metrics["in_progress"].inc()
+
+
+def _record_request(response: Response) -> Response:
+    started = g.get("_metrics_started")
+    endpoint = request.endpoint or "unmatched"
+    if started is None or endpoint == "metrics":
+        return response
+    _metrics["latency"].labels(endpoint, request.method, str(response.status_code)).observe(
+        time.perf_counter() - started
+    )
+    stats = current_stats()
+    if stats is not None:
+        _metrics["queries"].labels(endpoint).observe(stats.queries)
+    return response
+
+
+def _end_request(exc=None) -> None:
+    # Runs when the request context closes, i.e. after a streamed body has been sent.
+    if g.pop("_metrics_started", None) is not None:
+        _metrics["in_progress"].dec()
+
+
+def observe_upload(size: int, seconds: float) -> None:
+    if _metrics is not None:
+        _metrics["upload_size"].observe(size)
+        _metrics["upload_duration"].observe(seconds)
+
+
+def observe_password_verify(scheme: str, seconds: float) -> None:
+    if _metrics is not None:
+        _metrics["password_verify"].labels(scheme).observe(seconds)
+
+
+class RequirementCounts:
+    """Collector for the current requirement totals, read when scraped."""
+
+    def collect(self):
+        from prometheus_client.core import GaugeMetricFamily
+
+        from . import stats
+
+        family = GaugeMetricFamily("requirements", "Requirements by department and status", labels=("department", "status"))
+        for department, counts in stats.all_counts().items():
+            for status, total in counts.items():
+                family.add_metric((department.name, status.name), total)
+        yield family
+
+
+def _authorized() -> bool:
+    token = current_app.config["METRICS_TOKEN"]
+    if not token:
+        return True
+    auth = request.headers.get("Authorization", "")
+    return auth.startswith("Bearer ") and hmac.compare_digest(auth[len("Bearer "):].strip(), token)
+
+
+def metrics_view():
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest, multiprocess
+
+    if not _authorized():
+        abort(401)
+    registry = CollectorRegistry()
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry.register(REGISTRY)
+    registry.register(RequirementCounts())
+    response = Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+    response.headers["Cache-Control"] = "no-store"
+    return response
@@ -5,10 +5,10 @@ from datetime import datetime
 from typing import Optional, List
 
 from flask_login import UserMixin
-from sqlalchemy import Enum, ForeignKey, Boolean
+from sqlalchemy import Enum, ForeignKey, Boolean, Index, UniqueConstraint, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from . import db, login_manager, bcrypt
+from . import db, login_manager, passwords
 
 
 class Department(enum.Enum):
@@ -26,7 +26,9 @@ class RequirementStatus(enum.Enum):
 
 @login_manager.user_loader
 def load_user(user_id: str) -> Optional["User"]:
-    return db.session.get(User, int(user_id))
+    from .user_cache import load  # user_cache depends on this module
+
+    return load(int(user_id))
 
 
 class User(UserMixin, db.Model):
@@ -48,21 +50,45 @@ class User(UserMixin, db.Model):
     )
 
     def set_password(self, password: str) -> None:
-        self.password_hash = bcrypt.generate_password_hash(password).decode("utf-8")
+        self.password_hash = passwords.hash_password(password)
 
     def check_password(self, password: str) -> bool:
-        return bcrypt.check_password_hash(self.password_hash, password)
+        return passwords.verify(self.password_hash, password)
 
 
 class Requirement(db.Model):
     __tablename__ = "requirements"
+    __table_args__ = (
+        # Backs keyset pagination: WHERE department = ? ORDER BY created_at DESC, id DESC
+        Index("ix_requirements_department_created_at_id", "department", "created_at", "id"),
+        # Per-staff dashboard views: WHERE department = ? AND staff_id = ? AND status IN (...) ORDER BY created_at
+        Index("ix_requirements_department_staff_status_created_at", "department", "staff_id", "status", "created_at"),
+        # Single-status dashboards: WHERE department = ? AND status = ? ORDER BY created_at DESC, id DESC
+        Index("ix_requirements_department_status_created_at_id", "department", "status", "created_at", "id"),
+        # Public page cache validator and change feeds: WHERE department = ? ... max(updated_at) / updated_at > ?
+        Index("ix_requirements_department_updated_at_id", "department", "updated_at", "id"),
+        # The default "open" dashboards; only NEW and IN_PROGRESS rows, so it stays small as history grows
+        Index(
+            "ix_requirements_open_department_created_at_id",
+            "department",
+            "created_at",
+            "id",
+            sqlite_where=text("status IN ('NEW', 'IN_PROGRESS')"),
+            postgresql_where=text("status IN ('NEW', 'IN_PROGRESS')"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     customer_name: Mapped[str] = mapped_column(index=True)
     contact_info: Mapped[str]
     details: Mapped[str]
-    image_filename: Mapped[Optional[str]] = mapped_column(nullable=True)
+    image_filename: Mapped[Optional[str]] = mapped_column(nullable=True, index=True)
+    image_thumb_filename: Mapped[Optional[str]] = mapped_column(nullable=True)
+    image_medium_filename: Mapped[Optional[str]] = mapped_column(nullable=True)
+    # Display copy of the staff member's name; staff_id is kept in step by app.roster.
     staff_name: Mapped[str] = mapped_column(index=True, default="Unassigned")
+    staff_id: Mapped[Optional[int]] = mapped_column(ForeignKey("staff.id"), nullable=True)
+    staff: Mapped[Optional["Staff"]] = relationship("Staff")
     status: Mapped[RequirementStatus] = mapped_column(
         Enum(RequirementStatus), default=RequirementStatus.NEW, index=True
     )
@@ -86,3 +112,33 @@ class Requirement(db.Model):
     )
 
 
+class Staff(db.Model):
+    """People requirements can be assigned to, per department; listed in the staff pickers via ``app.roster``."""
+
+    __tablename__ = "staff"
+    __table_args__ = (UniqueConstraint("department", "name", name="uq_staff_department_name"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    department: Mapped[Department] = mapped_column(Enum(Department), index=True)
+    name: Mapped[str] = mapped_column(db.String(100))
+    active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+
+
+class RequirementCounter(db.Model):
+    """Running number of requirements per (department, status), maintained by ``app.stats``."""
+
+    __tablename__ = "requirement_counters"
+
+    department: Mapped[Department] = mapped_column(Enum(Department), primary_key=True)
+    status: Mapped[RequirementStatus] = mapped_column(Enum(RequirementStatus), primary_key=True)
+    total: Mapped[int] = mapped_column(default=0, nullable=False)
+
+
+class AppState(db.Model):
+    """Small key/value facts about the deployment itself (bootstrap marker, cache versions)."""
+
+    __tablename__ = "app_state"
+
+    key: Mapped[str] = mapped_column(db.String(64), primary_key=True)
+    value: Mapped[str] = mapped_column(db.String(255))
+    updated_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, onupdate=datetime.utcnow)
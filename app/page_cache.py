@@ -0,0 +1,176 @@
+"""Response cache and conditional GET for the public department pages.
+
+``browse_dept`` and ``public_detail`` are opened anonymously by shop-floor
+tablets that refresh all day. For anonymous GETs :func:`cached_public_view`
+first computes the department's *validator* in one small query: the
+latest ``updated_at`` (from ``ix_requirements_department_updated_at_id``),
+the row count (from ``requirement_counters``) and the staff roster version.
+Any create, edit, status change or delete in the department changes it.
+
+* The ETag is derived from the validator, the URL and the client's CSRF
+  session token, so an unchanged page costs the client a ``304``.
+* Rendered pages are kept in an LRU keyed on the department, URL and
+  validator, so a changed page is rendered once per process, not per
+  tablet. Commits touching a department also drop its entries at once.
+
+Logged-in users and requests with pending flash messages bypass the cache
+(the page would differ). The per-session CSRF token in ``public_detail``'s
+form is swapped out of the stored body and back in for every client.
+"""
+from __future__ import annotations
+
+import hashlib
+import time
+from functools import wraps
+from typing import Callable, Optional
+
+from flask import Flask, current_app, g, request, session
+from flask_login import current_user
+from flask_wtf.csrf import generate_csrf
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session, object_session
+
+from . import db
+from .cache import LayeredCache, LRUCache, RedisCache
+from .models import AppState, Department, Requirement, RequirementCounter
+from .roster import VERSION_KEY
+
+
+CSRF_PLACEHOLDER = "\x00csrf-token\x00"
+# Signed CSRF tokens expire (WTF_CSRF_TIME_LIMIT, 1h by default); make clients refetch well before that.
+CSRF_REFRESH_SECONDS = 1800
+
+_TOUCHED_KEY = "page_cache_departments"
+
+
+def init_app(app: Flask) -> None:
+    shared = None
+    if app.config["CACHE_REDIS_URL"]:
+        shared = RedisCache(app.config["CACHE_REDIS_URL"], prefix="page:", ttl=app.config["PAGE_CACHE_TTL"])
+    local = LRUCache(maxsize=app.config["PAGE_CACHE_SIZE"], ttl=app.config["PAGE_CACHE_TTL"])
+    app.extensions["page_cache"] = LayeredCache(local, shared)
+
+
+def _cache() -> LayeredCache:
+    return current_app.extensions["page_cache"]
+
+
+def department_validator(department: Department) -> str:
+    """Token that changes whenever anything shown on the department's public pages changes."""
+    latest = (
+        select(func.max(Requirement.updated_at)).where(Requirement.department == department).scalar_subquery()
+    )
+    total = (
+        select(func.coalesce(func.sum(RequirementCounter.total), 0))
+        .where(RequirementCounter.department == department)
+        .scalar_subquery()
+    )
+    roster_version = select(AppState.value).where(AppState.key == VERSION_KEY).scalar_subquery()
+    row = db.session.execute(select(latest, total, roster_version)).one()
+    return "|".join(str(value) for value in row)
+
+
+def _cacheable() -> bool:
+    return (
+        current_app.config["PAGE_CACHE_ENABLED"]
+        and request.method in ("GET", "HEAD")
+        and not current_user.is_authenticated
+        and "_flashes" not in session
+    )
+
+
+def _digest(*parts: object) -> str:
+    return hashlib.sha1("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+
+def _department_from_request() -> Optional[Department]:
+    try:
+        return Department[(request.view_args or {}).get("dept", "").upper()]
+    except KeyError:
+        return None
+
+
+def cached_public_view(view: Callable) -> Callable:
+    """Serve ``view`` through the page cache; the route must have a ``<dept>`` argument."""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        department = _department_from_request()
+        if department is None or not _cacheable():
+            return view(*args, **kwargs)
+
+        validator = department_validator(department)
+        url = request.full_path
+        key = f"{department.name}:{_digest(url, validator)}"
+        csrf_session = session.get(current_app.config.get("WTF_CSRF_FIELD_NAME", "csrf_token"))
+        etag = _digest(key, csrf_session, int(time.time() // CSRF_REFRESH_SECONDS))
+
+        if etag in request.if_none_match:
+            response = current_app.response_class(status=304)
+        else:
+            body = _cache().get(key)
+            if body is None:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.mimetype != "text/html":
+                    return response
+                body = response.get_data(as_text=True)
+                token = g.get("csrf_token")
+                if token:
+                    body = body.replace(token, CSRF_PLACEHOLDER)
+                _cache().set(key, body)
+            if CSRF_PLACEHOLDER in body:
+                body = body.replace(CSRF_PLACEHOLDER, generate_csrf())
+                # The token may have been created just now; recompute so the ETag matches the next request.
+                csrf_session = session.get(current_app.config.get("WTF_CSRF_FIELD_NAME", "csrf_token"))
+                etag = _digest(key, csrf_session, int(time.time() // CSRF_REFRESH_SECONDS))
+            response = current_app.response_class(body, mimetype="text/html")
+
+        response.set_etag(etag)
+        # Revalidate on every load: the ETag check is cheap, stale lists are not.
+        response.cache_control.no_cache = True
+        response.cache_control.private = True
+        response.vary.add("Cookie")
+        return response
+
+    return wrapper
+
+
+def invalidate(department: Department) -> None:
+    """Drop this process's cached pages for ``department`` (other processes see a new validator)."""
+    try:
+        _cache().local.delete_prefix(f"{department.name}:")
+    except Exception:
+        current_app.logger.exception("Page cache invalidation failed")
+
+
+def _touch(target: Requirement, *departments: Optional[Department]) -> None:
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_TOUCHED_KEY, set()).update(d for d in departments if d is not None)
+
+
+@event.listens_for(Requirement, "after_insert")
+def _after_insert(mapper, connection, target):
+    _touch(target, target.department)
+
+
+@event.listens_for(Requirement, "after_update")
+def _after_update(mapper, connection, target):
+    history = inspect(target).attrs.department.history
+    _touch(target, target.department, *(history.deleted or ()))
+
+
+@event.listens_for(Requirement, "after_delete")
+def _after_delete(mapper, connection, target):
+    _touch(target, target.department)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    for department in session.info.pop(_TOUCHED_KEY, None) or ():
+        invalidate(department)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _after_rollback(session, previous_transaction):
+    session.info.pop(_TOUCHED_KEY, None)
@@ -0,0 +1,171 @@
+"""Keyset (cursor) pagination for requirement lists.
+
+Lists are ordered newest first on ``(created_at, id)``. A cursor is the
+opaque, URL-safe encoding of one row's key; ``after`` asks for the rows older
+than the cursor (next page) and ``before`` for the rows newer than it
+(previous page). Each page costs a single indexed range scan no matter how
+deep into the history the user has paged.
+"""
+from __future__ import annotations
+
+import base64
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from flask import current_app, request, url_for
+from sqlalchemy import Select, bindparam, select, tuple_
+
+from . import db
+from .models import Requirement
+
+
+# What the dashboard tables show. Lists select only these and get plain named-tuple rows back,
+# skipping ``details``/``contact_info`` and the ORM identity map entirely.
+LIST_COLUMNS = (
+    Requirement.id,
+    Requirement.department,
+    Requirement.customer_name,
+    Requirement.staff_name,
+    Requirement.status,
+    Requirement.created_at,
+    Requirement.image_filename,
+    Requirement.image_thumb_filename,
+)
+
+
+def list_select() -> Select:
+    """``SELECT`` of the list columns, to be filtered and handed to :func:`paginate`."""
+    return select(*LIST_COLUMNS)
+
+
+@dataclass
+class Page:
+    items: List[Any] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self) -> bool:
+        return self.prev_cursor is not None
+
+
+def encode_cursor(created_at: datetime, item_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{item_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    """Return ``(created_at, id)`` for a cursor, or None if it is missing or malformed."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_raw, id_raw = base64.urlsafe_b64decode(padded).decode("utf-8").split("|", 1)
+        return datetime.fromisoformat(created_raw), int(id_raw)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def cursor_for(item: Any) -> str:
+    return encode_cursor(item.created_at, item.id)
+
+
+def page_size() -> int:
+    """Page size from ``?per_page=``, clamped to the configured maximum."""
+    default = current_app.config["REQUIREMENTS_PAGE_SIZE"]
+    maximum = current_app.config["REQUIREMENTS_MAX_PAGE_SIZE"]
+    try:
+        size = int(request.args.get("per_page", default))
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, maximum))
+
+
+def keyset_condition(key: Tuple[datetime, int], older: bool):
+    """Row-value comparison against ``(created_at, id)`` that the composite index can seek on."""
+    columns = tuple_(Requirement.created_at, Requirement.id)
+    bound = tuple_(
+        bindparam(None, key[0], type_=Requirement.created_at.type),
+        bindparam(None, key[1], type_=Requirement.id.type),
+    )
+    return columns < bound if older else columns > bound
+
+
+def page_statement(
+    query: Select,
+    after_key: Optional[Tuple[datetime, int]] = None,
+    before_key: Optional[Tuple[datetime, int]] = None,
+    size: int = 50,
+) -> Select:
+    """``query`` restricted to one page: keyset condition, index order and ``LIMIT size + 1``."""
+    if before_key is not None:
+        query = query.where(keyset_condition(before_key, older=False)).order_by(
+            Requirement.created_at.asc(), Requirement.id.asc()
+        )
+    else:
+        if after_key is not None:
+            query = query.where(keyset_condition(after_key, older=True))
+        query = query.order_by(Requirement.created_at.desc(), Requirement.id.desc())
+    return query.limit(size + 1)
+
+
+def paginate(query: Select, after: Optional[str] = None, before: Optional[str] = None, size: Optional[int] = None) -> Page:
+    """Fetch one page of ``query`` using keyset pagination.
+
+    ``query`` is usually :func:`list_select` (items are rows) but may be
+    ``select(Requirement)`` (items are entities).
+    """
+    size = size or page_size()
+    after_key = decode_cursor(after)
+    before_key = decode_cursor(before) if after_key is None else None
+
+    result = db.session.execute(page_statement(query, after_key, before_key, size))
+    rows = list(result if len(query.selected_columns) > 1 else result.scalars())
+    return build_page(rows, size, after_key, before_key)
+
+
+def build_page(
+    rows: List[Any],
+    size: int,
+    after_key: Optional[Tuple[datetime, int]] = None,
+    before_key: Optional[Tuple[datetime, int]] = None,
+) -> Page:
+    """Turn up to ``size + 1`` fetched rows into a Page.
+
+    ``rows`` must be in fetch order: newest first normally, oldest first when
+    paging backwards with ``before_key``.
+    """
+    has_more = len(rows) > size
+    rows = rows[:size]
+
+    page = Page(items=rows)
+    if before_key is not None:
+        rows.reverse()
+        if rows:
+            # The row the ``before`` cursor points at is older than this page, so there is always a next page.
+            page.next_cursor = cursor_for(rows[-1])
+            if has_more:
+                page.prev_cursor = cursor_for(rows[0])
+    elif rows:
+        if has_more:
+            page.next_cursor = cursor_for(rows[-1])
+        if after_key is not None:
+            page.prev_cursor = cursor_for(rows[0])
+    return page
+
+
+def url_with_args(**overrides: Any) -> str:
+    """URL for the current endpoint keeping the query string, with ``overrides`` applied (None drops a key)."""
+    args = request.args.to_dict()
+    for key, value in overrides.items():
+        if value is None:
+            args.pop(key, None)
+        else:
+            args[key] = value
+    # View arguments win over same-named query parameters (e.g. /dept/GIFTS?dept=x).
+    return url_for(request.endpoint, **{**args, **(request.view_args or {})})
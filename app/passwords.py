@@ -0,0 +1,139 @@
+"""Password hashing policy.
+
+``PASSWORD_SCHEME`` picks how new hashes are made: ``bcrypt`` (default, cost
+``BCRYPT_LOG_ROUNDS``) or ``argon2`` (argon2id through ``argon2-cffi``, with
+``ARGON2_TIME_COST`` / ``ARGON2_MEMORY_COST`` / ``ARGON2_PARALLELISM``).
+Existing hashes of either kind keep verifying; :func:`needs_rehash` tells
+the login view when one was made with other parameters so it can be
+replaced while the plain password is at hand.
+
+Hashing and verification run on a small per-process thread pool (both
+libraries release the GIL). ``PASSWORD_WORKERS`` bounds how many run at
+once and ``PASSWORD_QUEUE_LIMIT`` how many may wait; past that
+:class:`PasswordPoolBusy` is raised at once, so a burst of logins is turned
+away early instead of tying up every worker thread.
+"""
+from __future__ import annotations
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore, Lock
+from typing import Callable, Optional, TypeVar
+
+from flask import current_app
+
+from . import bcrypt, metrics
+
+
+T = TypeVar("T")
+
+
+class PasswordPoolBusy(RuntimeError):
+    pass
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_slots: Optional[BoundedSemaphore] = None
+_executor_pid: Optional[int] = None
+_executor_lock = Lock()
+
+
+def _argon2_hasher():
+    try:
+        from argon2 import PasswordHasher
+    except ImportError as exc:  # pragma: no cover - depends on deployment
+        raise RuntimeError("argon2 password hashes require the argon2-cffi package") from exc
+
+    config = current_app.config
+    return PasswordHasher(
+        time_cost=config["ARGON2_TIME_COST"],
+        memory_cost=config["ARGON2_MEMORY_COST"],
+        parallelism=config["ARGON2_PARALLELISM"],
+    )
+
+
+def _is_argon2(password_hash: str) -> bool:
+    return password_hash.startswith("$argon2")
+
+
+def _bcrypt_rounds(password_hash: str) -> Optional[int]:
+    # $2b$<cost>$<salt+digest>
+    parts = password_hash.split("$")
+    return int(parts[2]) if len(parts) > 3 and parts[2].isdigit() else None
+
+
+def _hash(password: str) -> str:
+    if current_app.config["PASSWORD_SCHEME"] == "argon2":
+        return _argon2_hasher().hash(password)
+    return bcrypt.generate_password_hash(password, current_app.config["BCRYPT_LOG_ROUNDS"]).decode("utf-8")
+
+
+def _verify(password_hash: str, password: str) -> bool:
+    started = time.perf_counter()
+    try:
+        return _check(password_hash, password)
+    finally:
+        metrics.observe_password_verify(
+            "argon2" if _is_argon2(password_hash) else "bcrypt", time.perf_counter() - started
+        )
+
+
+def _check(password_hash: str, password: str) -> bool:
+    if _is_argon2(password_hash):
+        from argon2.exceptions import InvalidHashError, VerificationError
+
+        try:
+            return _argon2_hasher().verify(password_hash, password)
+        except (VerificationError, InvalidHashError):
+            return False
+    try:
+        return bcrypt.check_password_hash(password_hash, password)
+    except ValueError:  # malformed hash
+        return False
+
+
+def _get_pool() -> tuple[ThreadPoolExecutor, BoundedSemaphore]:
+    global _executor, _slots, _executor_pid
+    with _executor_lock:
+        # Gunicorn forks workers after import; each process needs its own pool.
+        if _executor is None or _executor_pid != os.getpid():
+            workers = current_app.config["PASSWORD_WORKERS"]
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="passwords")
+            _slots = BoundedSemaphore(workers + current_app.config["PASSWORD_QUEUE_LIMIT"])
+            _executor_pid = os.getpid()
+        return _executor, _slots
+
+
+def _run(fn: Callable[..., T], *args) -> T:
+    executor, slots = _get_pool()
+    if not slots.acquire(blocking=False):
+        raise PasswordPoolBusy("Too many password checks in progress.")
+    try:
+        app = current_app._get_current_object()
+        return executor.submit(_in_app_context, app, fn, *args).result()
+    finally:
+        slots.release()
+
+
+def _in_app_context(app, fn, *args):
+    with app.app_context():
+        return fn(*args)
+
+
+def hash_password(password: str) -> str:
+    return _run(_hash, password)
+
+
+def verify(password_hash: str, password: str) -> bool:
+    if not password_hash:
+        return False
+    return _run(_verify, password_hash, password)
+
+
+def needs_rehash(password_hash: str) -> bool:
+    """True if ``password_hash`` was not made with the current scheme and parameters."""
+    config = current_app.config
+    if config["PASSWORD_SCHEME"] == "argon2":
+        return not _is_argon2(password_hash) or _argon2_hasher().check_needs_rehash(password_hash)
+    return _is_argon2(password_hash) or _bcrypt_rounds(password_hash) != config["BCRYPT_LOG_ROUNDS"]
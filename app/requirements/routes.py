@@ -1,76 +1,70 @@
-import os
-from uuid import uuid4
-from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app, send_from_directory
-from werkzeug.utils import secure_filename
+from flask import Blueprint, abort, render_template, redirect, url_for, flash, request
 from flask_login import login_required, current_user
 
-from .. import db
+from .. import db, exporter, images, live, page_cache, roster, stats, uploads
+from ..instrumentation import query_budget
 from ..forms import RequirementForm, UpdateStatusForm
 from ..models import Requirement, RequirementStatus, Department, User
+from ..filters import RequirementFilters
+from ..pagination import list_select, paginate
 
 
 requirements_bp = Blueprint("requirements", __name__)
 
 
 @requirements_bp.route("/")
+@query_budget(6)
 @login_required
 def dashboard():
-    # Read filters
-    staff = request.args.get("staff", "").strip()
-    customer = request.args.get("customer", "").strip()
-    status = (request.args.get("status", "open") or "open").strip().lower()
-
-    query = db.select(Requirement).where(Requirement.department == current_user.department)
-
-    if staff:
-        query = query.where(Requirement.staff_name.ilike(f"%{staff}%"))
-    if customer:
-        query = query.where(Requirement.customer_name.ilike(f"%{customer}%"))
-
-    if status == "open":
-        query = query.where(Requirement.status.in_([RequirementStatus.NEW, RequirementStatus.IN_PROGRESS]))
-    elif status in {"new", "in_progress", "fulfilled"}:
-        query = query.where(Requirement.status == RequirementStatus(status.upper()))
-    # else: 'all' shows everything
-
-    items = db.session.execute(query.order_by(Requirement.created_at.desc())).scalars().all()
-
-    # Staff list for convenience filter per department
-    dept_staff = {
-        Department.GIFTS: ["Threeshma", "Ansuya", "Anita", "Harika", "Praveen"],
-        Department.STATIONERY: ["Mastaan", "Sunita", "Akash", "Rajesh"],
-        Department.TOYS: ["Sony", "Sai", "Satya"],
-        Department.BOOKS: ["Anjan", "Shiva", "Lavanya"],
-    }
-    staff_list = dept_staff.get(current_user.department, [])
+    filters = RequirementFilters.from_request()
+    query = list_select().where(Requirement.department == current_user.department, *filters.clauses())
+
+    page = paginate(query, after=request.args.get("after"), before=request.args.get("before"))
+
+    staff_list = roster.members(current_user.department)
 
     return render_template(
         "requirements/dashboard.html",
-        items=items,
+        items=page.items,
+        page=page,
         Department=Department,
         RequirementStatus=RequirementStatus,
-        filter_staff=staff,
-        filter_customer=customer,
-        filter_status=status,
+        **filters.template_context(),
         staff_list=staff_list,
         dept_title=current_user.department.value,
+        counts=stats.department_counts(current_user.department),
         public_view=False,
+        **live.template_context("requirements.dashboard_events", page),
     )
 
 
+@requirements_bp.route("/export")
+@login_required
+def dashboard_export():
+    """The dashboard's filtered list as CSV (``?format=xlsx`` for Excel), all pages."""
+    filters = RequirementFilters.from_request()
+    query = exporter.export_select().where(Requirement.department == current_user.department, *filters.clauses())
+    try:
+        return exporter.export_response(
+            query, request.args.get("format", "csv").lower(), f"requirements-{current_user.department.name.lower()}"
+        )
+    except exporter.ExportError as exc:
+        abort(400, str(exc))
+
+
+@requirements_bp.route("/events")
+@login_required
+def dashboard_events():
+    """Server-Sent Events keeping the dashboard table current."""
+    return live.stream_response(current_user.department, public_view=False)
+
+
 @requirements_bp.route("/create", methods=["GET", "POST"])
+@query_budget(8)
 @login_required
 def create_requirement():
     form = RequirementForm()
-    # Populate staff choices based on logged-in user's department
-    dept_staff = {
-        Department.GIFTS: ["Threeshma", "Ansuya", "Anita", "Harika", "Praveen"],
-        Department.STATIONERY: ["Mastaan", "Sunita", "Akash", "Rajesh"],
-        Department.TOYS: ["Sony", "Sai", "Satya"],
-        Department.BOOKS: ["Anjan", "Shiva", "Lavanya"],
-    }
-    staff_list = dept_staff.get(current_user.department, [])
-    form.staff_name.choices = [("", "Select staff...")] + [(s, s) for s in staff_list]
+    form.staff_name.choices = roster.choices(current_user.department)
     if form.validate_on_submit():
         requirement = Requirement(
             customer_name=form.customer_name.data,
@@ -80,17 +74,13 @@ def create_requirement():
             department=current_user.department,
             created_by=current_user,
         )
-        image_file = form.image.data
-        if image_file and getattr(image_file, "filename", ""):
-            original_name = secure_filename(image_file.filename)
-            ext = original_name.rsplit(".", 1)[-1].lower() if "." in original_name else ""
-            if ext not in current_app.config["ALLOWED_IMAGE_EXTENSIONS"]:
-                flash("Invalid image type.", "danger")
-                return render_template("requirements/create.html", form=form)
-            unique_name = f"{uuid4().hex}.{ext}"
-            save_path = os.path.join(current_app.config["UPLOAD_FOLDER"], unique_name)
-            image_file.save(save_path)
-            requirement.image_filename = unique_name
+        try:
+            image_key = images.image_from_form(form.image.data, form.upload_id.data)
+        except images.InvalidImage:
+            flash("Invalid image type.", "danger")
+            return render_template("requirements/create.html", form=form)
+        if image_key:
+            requirement.image_filename = image_key
         db.session.add(requirement)
         db.session.commit()
         flash("Requirement created", "success")
@@ -99,6 +89,7 @@ def create_requirement():
 
 
 @requirements_bp.route("/<int:req_id>", methods=["GET", "POST"])
+@query_budget(8)
 @login_required
 def detail(req_id: int):
     requirement = db.session.get(Requirement, req_id)
@@ -113,19 +104,15 @@ def detail(req_id: int):
         new_status = RequirementStatus(form.status.data)
         # If moving to FULFILLED, require image if none exists yet
         if new_status == RequirementStatus.FULFILLED and not requirement.image_filename:
-            image_file = form.fulfill_image.data
-            if not image_file or not getattr(image_file, "filename", ""):
-                flash("Please upload a product image to mark as Fulfilled.", "danger")
-                return render_template("requirements/detail.html", item=requirement, form=form, from_admin=request.args.get("from_admin"))
-            original_name = secure_filename(image_file.filename)
-            ext = original_name.rsplit(".", 1)[-1].lower() if "." in original_name else ""
-            if ext not in current_app.config["ALLOWED_IMAGE_EXTENSIONS"]:
+            try:
+                image_key = images.image_from_form(form.fulfill_image.data, form.upload_id.data)
+            except images.InvalidImage:
                 flash("Invalid image type.", "danger")
                 return render_template("requirements/detail.html", item=requirement, form=form, from_admin=request.args.get("from_admin"))
-            unique_name = f"{uuid4().hex}.{ext}"
-            save_path = os.path.join(current_app.config["UPLOAD_FOLDER"], unique_name)
-            image_file.save(save_path)
-            requirement.image_filename = unique_name
+            if not image_key:
+                flash("Please upload a product image to mark as Fulfilled.", "danger")
+                return render_template("requirements/detail.html", item=requirement, form=form, from_admin=request.args.get("from_admin"))
+            requirement.image_filename = image_key
         requirement.status = new_status
         db.session.commit()
         flash("Status updated", "success")
@@ -136,7 +123,7 @@ def detail(req_id: int):
 @requirements_bp.route("/uploads/<path:filename>")
 def uploaded_file(filename: str):
     # Publicly accessible: images shown in public detail views
-    return send_from_directory(current_app.config["UPLOAD_FOLDER"], filename)
+    return uploads.send(filename)
 
 
 @requirements_bp.route("/browse")
@@ -152,6 +139,8 @@ def browse_redirect():
 
 
 @requirements_bp.route("/dept/<dept>")
+@query_budget(6)
+@page_cache.cached_public_view
 def browse_dept(dept: str):
     """Public department dashboard with filters and quick-create form link."""
     try:
@@ -160,46 +149,41 @@ def browse_dept(dept: str):
         flash("Department not found", "warning")
         return redirect(url_for("auth.login"))
 
-    staff = request.args.get("staff", "").strip()
-    customer = request.args.get("customer", "").strip()
-    status = (request.args.get("status", "open") or "open").strip().lower()
-
-    query = db.select(Requirement).where(Requirement.department == department_enum)
-    if staff:
-        query = query.where(Requirement.staff_name.ilike(f"%{staff}%"))
-    if customer:
-        query = query.where(Requirement.customer_name.ilike(f"%{customer}%"))
-    if status == "open":
-        query = query.where(Requirement.status.in_([RequirementStatus.NEW, RequirementStatus.IN_PROGRESS]))
-    elif status in {"new", "in_progress", "fulfilled"}:
-        query = query.where(Requirement.status == RequirementStatus(status.upper()))
-
-    items = db.session.execute(query.order_by(Requirement.created_at.desc())).scalars().all()
-
-    dept_staff = {
-        Department.GIFTS: ["Threeshma", "Ansuya", "Anita", "Harika", "Praveen"],
-        Department.STATIONERY: ["Mastaan", "Sunita", "Akash", "Rajesh"],
-        Department.TOYS: ["Sony", "Sai", "Satya"],
-        Department.BOOKS: ["Anjan", "Shiva", "Lavanya"],
-    }
-    staff_list = dept_staff.get(department_enum, [])
+    filters = RequirementFilters.from_request()
+    query = list_select().where(Requirement.department == department_enum, *filters.clauses())
+
+    page = paginate(query, after=request.args.get("after"), before=request.args.get("before"))
+
+    staff_list = roster.members(department_enum)
 
     return render_template(
         "requirements/dashboard.html",
-        items=items,
+        items=page.items,
+        page=page,
         Department=Department,
         RequirementStatus=RequirementStatus,
-        filter_staff=staff,
-        filter_customer=customer,
-        filter_status=status,
+        **filters.template_context(),
         staff_list=staff_list,
         dept_title=department_enum.value,
         dept_key=department_enum.name,
+        counts=stats.department_counts(department_enum),
         public_view=True,
+        **live.template_context("requirements.browse_dept_events", page, dept=department_enum.name),
     )
 
 
+@requirements_bp.route("/dept/<dept>/events")
+def browse_dept_events(dept: str):
+    try:
+        department_enum = Department[dept.upper()]
+    except KeyError:
+        return "", 404
+    return live.stream_response(department_enum, public_view=True)
+
+
 @requirements_bp.route("/dept/<dept>/<int:req_id>", methods=["GET", "POST"])
+@query_budget(8)
+@page_cache.cached_public_view
 def public_detail(dept: str, req_id: int):
     try:
         department_enum = Department[dept.upper()]
@@ -221,9 +205,10 @@ def public_detail(dept: str, req_id: int):
     if form.validate_on_submit():
         new_status = RequirementStatus(form.status.data)
         if new_status == RequirementStatus.FULFILLED and not requirement.image_filename:
-            image_file = form.fulfill_image.data
-            if not image_file or not getattr(image_file, "filename", ""):
-                flash("Please upload a product image to mark as Fulfilled.", "danger")
+            try:
+                image_key = images.image_from_form(form.fulfill_image.data, form.upload_id.data)
+            except images.InvalidImage:
+                flash("Invalid image type.", "danger")
                 return render_template(
                     "requirements/detail.html",
                     item=requirement,
@@ -233,10 +218,8 @@ def public_detail(dept: str, req_id: int):
                     cancel_url=url_for("requirements.browse_dept", dept=department_enum.name),
                     dept_key=department_enum.name,
                 )
-            original_name = secure_filename(image_file.filename)
-            ext = original_name.rsplit(".", 1)[-1].lower() if "." in original_name else ""
-            if ext not in current_app.config["ALLOWED_IMAGE_EXTENSIONS"]:
-                flash("Invalid image type.", "danger")
+            if not image_key:
+                flash("Please upload a product image to mark as Fulfilled.", "danger")
                 return render_template(
                     "requirements/detail.html",
                     item=requirement,
@@ -246,10 +229,7 @@ def public_detail(dept: str, req_id: int):
                     cancel_url=url_for("requirements.browse_dept", dept=department_enum.name),
                     dept_key=department_enum.name,
                 )
-            unique_name = f"{uuid4().hex}.{ext}"
-            save_path = os.path.join(current_app.config["UPLOAD_FOLDER"], unique_name)
-            image_file.save(save_path)
-            requirement.image_filename = unique_name
+            requirement.image_filename = image_key
         requirement.status = new_status
         db.session.commit()
         flash("Status updated", "success")
@@ -280,14 +260,7 @@ def public_edit(dept: str, req_id: int):
         return redirect(url_for("requirements.browse_dept", dept=department_enum.name))
 
     form = RequirementForm(obj=requirement)
-    dept_staff = {
-        Department.GIFTS: ["Threeshma", "Ansuya", "Anita", "Harika", "Praveen"],
-        Department.STATIONERY: ["Mastaan", "Sunita", "Akash", "Rajesh"],
-        Department.TOYS: ["Sony", "Sai", "Satya"],
-        Department.BOOKS: ["Anjan", "Shiva", "Lavanya"],
-    }
-    staff_list = dept_staff.get(requirement.department, [])
-    form.staff_name.choices = [("", "Select staff...")] + [(s, s) for s in staff_list]
+    form.staff_name.choices = roster.choices(requirement.department, requirement.staff_name)
 
     if form.validate_on_submit():
         requirement.customer_name = form.customer_name.data
@@ -295,17 +268,13 @@ def public_edit(dept: str, req_id: int):
         requirement.details = form.details.data
         requirement.staff_name = form.staff_name.data
 
-        image_file = form.image.data
-        if image_file and getattr(image_file, "filename", ""):
-            original_name = secure_filename(image_file.filename)
-            ext = original_name.rsplit(".", 1)[-1].lower() if "." in original_name else ""
-            if ext not in current_app.config["ALLOWED_IMAGE_EXTENSIONS"]:
-                flash("Invalid image type.", "danger")
-                return render_template("requirements/edit.html", form=form, item=requirement)
-            unique_name = f"{uuid4().hex}.{ext}"
-            save_path = os.path.join(current_app.config["UPLOAD_FOLDER"], unique_name)
-            image_file.save(save_path)
-            requirement.image_filename = unique_name
+        try:
+            image_key = images.image_from_form(form.image.data, form.upload_id.data)
+        except images.InvalidImage:
+            flash("Invalid image type.", "danger")
+            return render_template("requirements/edit.html", form=form, item=requirement)
+        if image_key:
+            requirement.image_filename = image_key
 
         db.session.commit()
         flash("Requirement updated", "success")
@@ -346,15 +315,7 @@ def create_requirement_public(dept: str):
 
     form = RequirementForm()
 
-    # Populate staff choices based on department
-    dept_staff = {
-        Department.GIFTS: ["Threeshma", "Ansuya", "Anita", "Harika", "Praveen"],
-        Department.STATIONERY: ["Mastaan", "Sunita", "Akash", "Rajesh"],
-        Department.TOYS: ["Sony", "Sai", "Satya"],
-        Department.BOOKS: ["Anjan", "Shiva", "Lavanya"],
-    }
-    staff_list = dept_staff.get(department_enum, [])
-    form.staff_name.choices = [("", "Select staff...")] + [(s, s) for s in staff_list]
+    form.staff_name.choices = roster.choices(department_enum)
 
     if form.validate_on_submit():
         # Find a default user for this department (seeded user, first non-admin)
@@ -377,17 +338,13 @@ def create_requirement_public(dept: str):
             created_by=default_user,
         )
 
-        image_file = form.image.data
-        if image_file and getattr(image_file, "filename", ""):
-            original_name = secure_filename(image_file.filename)
-            ext = original_name.rsplit(".", 1)[-1].lower() if "." in original_name else ""
-            if ext not in current_app.config["ALLOWED_IMAGE_EXTENSIONS"]:
-                flash("Invalid image type.", "danger")
-                return render_template("requirements/create.html", form=form, cancel_url=url_for("requirements.browse_dept", dept=department_enum.name))
-            unique_name = f"{uuid4().hex}.{ext}"
-            save_path = os.path.join(current_app.config["UPLOAD_FOLDER"], unique_name)
-            image_file.save(save_path)
-            requirement.image_filename = unique_name
+        try:
+            image_key = images.image_from_form(form.image.data, form.upload_id.data)
+        except images.InvalidImage:
+            flash("Invalid image type.", "danger")
+            return render_template("requirements/create.html", form=form, cancel_url=url_for("requirements.browse_dept", dept=department_enum.name))
+        if image_key:
+            requirement.image_filename = image_key
 
         db.session.add(requirement)
         db.session.commit()
@@ -411,15 +368,7 @@ def edit_requirement(req_id: int):
         return redirect(url_for("requirements.dashboard"))
 
     form = RequirementForm(obj=requirement)
-    # Populate staff choices based on the requirement's department
-    dept_staff = {
-        Department.GIFTS: ["Threeshma", "Ansuya", "Anita", "Harika", "Praveen"],
-        Department.STATIONERY: ["Mastaan", "Sunita", "Akash", "Rajesh"],
-        Department.TOYS: ["Sony", "Sai", "Satya"],
-        Department.BOOKS: ["Anjan", "Shiva", "Lavanya"],
-    }
-    staff_list = dept_staff.get(requirement.department, [])
-    form.staff_name.choices = [("", "Select staff...")] + [(s, s) for s in staff_list]
+    form.staff_name.choices = roster.choices(requirement.department, requirement.staff_name)
 
     if form.validate_on_submit():
         requirement.customer_name = form.customer_name.data
@@ -427,17 +376,13 @@ def edit_requirement(req_id: int):
         requirement.details = form.details.data
         requirement.staff_name = form.staff_name.data
 
-        image_file = form.image.data
-        if image_file and getattr(image_file, "filename", ""):
-            original_name = secure_filename(image_file.filename)
-            ext = original_name.rsplit(".", 1)[-1].lower() if "." in original_name else ""
-            if ext not in current_app.config["ALLOWED_IMAGE_EXTENSIONS"]:
-                flash("Invalid image type.", "danger")
-                return render_template("requirements/edit.html", form=form, item=requirement)
-            unique_name = f"{uuid4().hex}.{ext}"
-            save_path = os.path.join(current_app.config["UPLOAD_FOLDER"], unique_name)
-            image_file.save(save_path)
-            requirement.image_filename = unique_name
+        try:
+            image_key = images.image_from_form(form.image.data, form.upload_id.data)
+        except images.InvalidImage:
+            flash("Invalid image type.", "danger")
+            return render_template("requirements/edit.html", form=form, item=requirement)
+        if image_key:
+            requirement.image_filename = image_key
 
         db.session.commit()
         flash("Requirement updated", "success")
@@ -0,0 +1,154 @@
+"""Per-department staff lists for the staff pickers and filters.
+
+The ``Staff`` rows are held in process memory. Every change to
+``staff`` also writes a new token to ``app_state['staff_roster_version']``
+in the same transaction. Each process compares its token with that row at
+most every ``ROSTER_CHECK_INTERVAL`` seconds and reloads when it differs,
+so every worker shows the new roster within that interval (the process that
+made the change at once) and a request normally costs no query at all.
+
+Requirements keep the chosen name in ``staff_name`` for display; the
+mapper events at the bottom resolve it to ``staff_id`` whenever it is
+written, which is what the dashboards filter on.
+"""
+from __future__ import annotations
+
+import time
+from datetime import datetime
+from threading import Lock
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from uuid import uuid4
+
+from flask import current_app
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session, object_session
+
+from . import db
+from .models import AppState, Department, Requirement, Staff
+
+
+VERSION_KEY = "staff_roster_version"
+
+_STAFF_CHANGED_KEY = "roster_changed"
+
+app_state_table = AppState.__table__
+staff_table = Staff.__table__
+
+
+class Member(NamedTuple):
+    id: int
+    name: str
+    active: bool
+
+
+_lock = Lock()
+_roster: Dict[Department, Tuple[Member, ...]] = {}
+_version: Optional[str] = None
+_checked_at = float("-inf")
+
+
+def _current_version() -> Optional[str]:
+    return db.session.execute(select(AppState.value).where(AppState.key == VERSION_KEY)).scalar_one_or_none()
+
+
+def _load() -> Dict[Department, Tuple[Member, ...]]:
+    roster: Dict[Department, List[Member]] = {dept: [] for dept in Department}
+    rows = db.session.execute(select(Staff.department, Staff.id, Staff.name, Staff.active).order_by(Staff.id))
+    for department, staff_id, name, active in rows:
+        roster[department].append(Member(staff_id, name, active))
+    return {dept: tuple(members) for dept, members in roster.items()}
+
+
+def _refresh() -> None:
+    global _roster, _version, _checked_at
+    with _lock:
+        now = time.monotonic()
+        if now - _checked_at < current_app.config["ROSTER_CHECK_INTERVAL"]:
+            return
+        version = _current_version()
+        if version != _version or version is None:
+            _roster = _load()
+            _version = version
+        _checked_at = now
+
+
+def members(department: Department, active_only: bool = False) -> Tuple[Member, ...]:
+    """Staff of ``department`` in the order they were added."""
+    _refresh()
+    found = _roster.get(department, ())
+    return tuple(m for m in found if m.active) if active_only else found
+
+
+def names(department: Department) -> Tuple[str, ...]:
+    """Names of the active staff of ``department``."""
+    return tuple(m.name for m in members(department, active_only=True))
+
+
+def choices(department: Department, current: Optional[str] = None) -> List[Tuple[str, str]]:
+    """``SelectField`` choices for ``department``; ``current`` stays selectable even if no longer active."""
+    staff = list(names(department))
+    if current and current not in staff:
+        staff.append(current)
+    return [("", "Select staff...")] + [(name, name) for name in staff]
+
+
+def invalidate_local() -> None:
+    global _checked_at
+    with _lock:
+        _checked_at = float("-inf")
+
+
+def bump_version(connection: Connection) -> None:
+    values = {"value": uuid4().hex, "updated_at": datetime.utcnow()}
+    result = connection.execute(
+        app_state_table.update().where(app_state_table.c.key == VERSION_KEY).values(**values)
+    )
+    if result.rowcount == 0:
+        connection.execute(app_state_table.insert().values(key=VERSION_KEY, **values))
+
+
+def _staff_changed(mapper, connection, target):
+    bump_version(connection)
+    session = object_session(target)
+    if session is not None:
+        session.info[_STAFF_CHANGED_KEY] = True
+
+
+for _event in ("after_insert", "after_update", "after_delete"):
+    event.listen(Staff, _event, _staff_changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    if session.info.pop(_STAFF_CHANGED_KEY, False):
+        invalidate_local()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _after_rollback(session, previous_transaction):
+    session.info.pop(_STAFF_CHANGED_KEY, None)
+
+
+def _resolve_staff_id(connection: Connection, department: Department, name: Optional[str]) -> Optional[int]:
+    name = (name or "").strip()
+    if not name:
+        return None
+    return connection.execute(
+        select(staff_table.c.id)
+        .where(staff_table.c.department == department, func.lower(staff_table.c.name) == name.lower())
+        .order_by(staff_table.c.id)
+        .limit(1)
+    ).scalar()
+
+
+@event.listens_for(Requirement, "before_insert")
+def _link_staff_on_insert(mapper, connection, target):
+    target.staff_id = _resolve_staff_id(connection, target.department, target.staff_name)
+
+
+@event.listens_for(Requirement, "before_update")
+def _link_staff_on_update(mapper, connection, target):
+    state = inspect(target)
+    if state.attrs.staff_name.history.has_changes() or state.attrs.department.history.has_changes():
+        target.staff_id = _resolve_staff_id(connection, target.department, target.staff_name)
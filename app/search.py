@@ -0,0 +1,198 @@
+"""Indexed text search over requirements.
+
+SQLite keeps two FTS5 tables whose rowid is the requirement id:
+``requirements_fts`` (word tokens, for free-text search) and
+``requirements_fts_trigram`` (trigrams of the name and contact columns, so
+the customer filter keeps matching any substring: "han" finds "Rohan").
+They are written from mapper events below so every ORM insert, update and
+delete keeps them in step inside the same transaction. The trigram
+tokenizer needs SQLite 3.34 or newer. PostgreSQL
+needs no shadow table: expression GIN indexes (``tsvector`` for free text,
+``pg_trgm`` for name substrings) are maintained by the database itself.
+Other backends fall back to ``ILIKE``.
+
+Views should only use :func:`field_matches` and :func:`text_matches`, which
+return WHERE clauses for ``select(Requirement)``.
+"""
+from __future__ import annotations
+
+import re
+from typing import Iterable, List, Optional
+
+from sqlalchemy import DDL, event, func, inspect, literal_column, or_, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import column, table
+
+from . import db
+from .models import Requirement
+
+
+SEARCH_FIELDS = ("customer_name", "contact_info", "details", "staff_name")
+
+fts_table = table("requirements_fts", column("rowid"), *(column(name) for name in SEARCH_FIELDS))
+
+SQLITE_CREATE_FTS = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS requirements_fts USING fts5("
+    + ", ".join(SEARCH_FIELDS)
+    + ", tokenize='unicode61 remove_diacritics 2')"
+)
+SQLITE_DROP_FTS = "DROP TABLE IF EXISTS requirements_fts"
+SQLITE_BACKFILL_FTS = (
+    "INSERT INTO requirements_fts(rowid, " + ", ".join(SEARCH_FIELDS) + ") "
+    "SELECT id, " + ", ".join(SEARCH_FIELDS) + " FROM requirements"
+)
+
+# Substring matching needs at least one whole trigram; shorter terms fall back to LIKE.
+TRIGRAM_FIELDS = ("customer_name", "contact_info", "staff_name")
+TRIGRAM_MIN_LENGTH = 3
+
+trigram_table = table("requirements_fts_trigram", column("rowid"), *(column(name) for name in TRIGRAM_FIELDS))
+
+SQLITE_CREATE_TRIGRAM = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS requirements_fts_trigram USING fts5("
+    + ", ".join(TRIGRAM_FIELDS)
+    + ", tokenize='trigram')"
+)
+SQLITE_DROP_TRIGRAM = "DROP TABLE IF EXISTS requirements_fts_trigram"
+SQLITE_BACKFILL_TRIGRAM = (
+    "INSERT INTO requirements_fts_trigram(rowid, " + ", ".join(TRIGRAM_FIELDS) + ") "
+    "SELECT id, " + ", ".join(TRIGRAM_FIELDS) + " FROM requirements"
+)
+
+# Must match the expression used by text_matches() for the planner to pick the index up.
+PG_DOCUMENT = "coalesce(customer_name, '') || ' ' || coalesce(contact_info, '') || ' ' || coalesce(details, '') || ' ' || coalesce(staff_name, '')"
+PG_CREATE_INDEXES = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS ix_requirements_search_tsv ON requirements USING gin (to_tsvector('simple', {PG_DOCUMENT}))",
+    "CREATE INDEX IF NOT EXISTS ix_requirements_customer_name_trgm ON requirements USING gin (customer_name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_requirements_staff_name_trgm ON requirements USING gin (staff_name gin_trgm_ops)",
+)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _tokens(term: str) -> List[str]:
+    return _TOKEN_RE.findall(term.lower())
+
+
+def _dialect() -> str:
+    return db.session.get_bind().dialect.name
+
+
+def _fts_query(tokens: Iterable[str], field: Optional[str] = None) -> str:
+    # Every token is quoted (so FTS5 operators in user input are inert) and prefix-matched.
+    expr = " ".join(f'"{token}"*' for token in tokens)
+    return f"{field} : ({expr})" if field else expr
+
+
+def _fts_ids(query: str):
+    return select(fts_table.c.rowid).where(literal_column("requirements_fts").op("MATCH")(query))
+
+
+def _trigram_ids(field: str, term: str):
+    # A quoted string is matched as a substring of the column, case-insensitively.
+    query = f'{field} : "{term.replace(chr(34), chr(34) * 2)}"'
+    return select(trigram_table.c.rowid).where(literal_column("requirements_fts_trigram").op("MATCH")(query))
+
+
+def field_matches(field: str, term: str):
+    """WHERE clause matching ``term`` as a substring of one searchable column, e.g. ``customer_name``."""
+    if field not in SEARCH_FIELDS:
+        raise ValueError(f"{field!r} is not a searchable field")
+    dialect = _dialect()
+    if dialect == "sqlite" and field in TRIGRAM_FIELDS and len(term) >= TRIGRAM_MIN_LENGTH:
+        return Requirement.id.in_(_trigram_ids(field, term))
+    tokens = _tokens(term)
+    if dialect == "sqlite" and field not in TRIGRAM_FIELDS and tokens:
+        return Requirement.id.in_(_fts_ids(_fts_query(tokens, field)))
+    # PostgreSQL serves ILIKE '%term%' from the trigram index.
+    return getattr(Requirement, field).ilike(f"%{term}%")
+
+
+def text_matches(term: str):
+    """WHERE clause matching ``term`` anywhere in customer, contact, details or staff."""
+    dialect = _dialect()
+    tokens = _tokens(term)
+    if not tokens:
+        return None
+    if dialect == "sqlite":
+        return Requirement.id.in_(_fts_ids(_fts_query(tokens)))
+    if dialect == "postgresql":
+        document = func.to_tsvector("simple", literal_column(PG_DOCUMENT))
+        query = func.to_tsquery("simple", " & ".join(f"{token}:*" for token in tokens))
+        return document.op("@@")(query)
+    return or_(*(getattr(Requirement, name).ilike(f"%{term}%") for name in SEARCH_FIELDS))
+
+
+def rebuild(connection: Connection) -> None:
+    """Recreate the search index from ``requirements`` (used by migrations and ``flask reindex-search``)."""
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        connection.exec_driver_sql(SQLITE_CREATE_FTS)
+        connection.exec_driver_sql("DELETE FROM requirements_fts")
+        connection.exec_driver_sql(SQLITE_BACKFILL_FTS)
+        connection.exec_driver_sql(SQLITE_CREATE_TRIGRAM)
+        connection.exec_driver_sql("DELETE FROM requirements_fts_trigram")
+        connection.exec_driver_sql(SQLITE_BACKFILL_TRIGRAM)
+    elif dialect == "postgresql":
+        for statement in PG_CREATE_INDEXES:
+            connection.exec_driver_sql(statement)
+        connection.exec_driver_sql("REINDEX INDEX ix_requirements_search_tsv")
+
+
+# Schema created through db.create_all() gets the index too.
+event.listen(Requirement.__table__, "after_create", DDL(SQLITE_CREATE_FTS).execute_if(dialect="sqlite"))
+event.listen(Requirement.__table__, "after_create", DDL(SQLITE_CREATE_TRIGRAM).execute_if(dialect="sqlite"))
+event.listen(Requirement.__table__, "before_drop", DDL(SQLITE_DROP_FTS).execute_if(dialect="sqlite"))
+event.listen(Requirement.__table__, "before_drop", DDL(SQLITE_DROP_TRIGRAM).execute_if(dialect="sqlite"))
+for _statement in PG_CREATE_INDEXES:
+    event.listen(Requirement.__table__, "after_create", DDL(_statement).execute_if(dialect="postgresql"))
+
+
+def _index_row(connection: Connection, target: Requirement) -> None:
+    connection.execute(
+        fts_table.insert().values(rowid=target.id, **{name: getattr(target, name) for name in SEARCH_FIELDS})
+    )
+    connection.execute(
+        trigram_table.insert().values(rowid=target.id, **{name: getattr(target, name) for name in TRIGRAM_FIELDS})
+    )
+
+
+def index_rows(connection: Connection, rows: List[dict]) -> None:
+    """Index rows written without the ORM (bulk imports); each dict has ``id`` and the search fields."""
+    if connection.dialect.name == "sqlite" and rows:
+        connection.execute(
+            fts_table.insert(),
+            [{"rowid": row["id"], **{name: row[name] for name in SEARCH_FIELDS}} for row in rows],
+        )
+        connection.execute(
+            trigram_table.insert(),
+            [{"rowid": row["id"], **{name: row[name] for name in TRIGRAM_FIELDS}} for row in rows],
+        )
+
+
+def _unindex_row(connection: Connection, requirement_id: int) -> None:
+    connection.execute(fts_table.delete().where(fts_table.c.rowid == requirement_id))
+    connection.execute(trigram_table.delete().where(trigram_table.c.rowid == requirement_id))
+
+
+@event.listens_for(Requirement, "after_insert")
+def _after_insert(mapper, connection, target):
+    if connection.dialect.name == "sqlite":
+        _index_row(connection, target)
+
+
+@event.listens_for(Requirement, "after_update")
+def _after_update(mapper, connection, target):
+    if connection.dialect.name != "sqlite":
+        return
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in SEARCH_FIELDS):
+        _unindex_row(connection, target.id)
+        _index_row(connection, target)
+
+
+@event.listens_for(Requirement, "after_delete")
+def _after_delete(mapper, connection, target):
+    if connection.dialect.name == "sqlite":
+        _unindex_row(connection, target.id)
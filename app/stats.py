@@ -0,0 +1,122 @@
+"""Per-department status counters.
+
+``requirement_counters`` holds one row per (department, status). Mapper
+events adjust the affected rows inside the same flush that inserts, updates
+or deletes a requirement, so the numbers commit or roll back together with
+the change and reading them never scans ``requirements``.
+"""
+from __future__ import annotations
+
+from collections import Counter
+from typing import Dict, Iterable, Tuple
+
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.engine import Connection
+
+from . import db
+from .models import Department, Requirement, RequirementCounter, RequirementStatus
+
+
+counters_table = RequirementCounter.__table__
+
+CounterKey = Tuple[Department, RequirementStatus]
+
+
+def _zeroed() -> Dict[Department, Dict[RequirementStatus, int]]:
+    return {dept: {status: 0 for status in RequirementStatus} for dept in Department}
+
+
+def all_counts() -> Dict[Department, Dict[RequirementStatus, int]]:
+    """``{department: {status: total}}`` for every department, zero-filled."""
+    counts = _zeroed()
+    for row in db.session.execute(select(RequirementCounter)).scalars():
+        counts[row.department][row.status] = row.total
+    return counts
+
+
+def department_counts(department: Department) -> Dict[RequirementStatus, int]:
+    counts = {status: 0 for status in RequirementStatus}
+    rows = db.session.execute(
+        select(RequirementCounter).where(RequirementCounter.department == department)
+    ).scalars()
+    for row in rows:
+        counts[row.status] = row.total
+    return counts
+
+
+def apply_deltas(connection: Connection, deltas: Dict[CounterKey, int]) -> None:
+    """Add ``deltas`` to the counters, creating rows that do not exist yet."""
+    for (department, status), delta in deltas.items():
+        if not delta:
+            continue
+        result = connection.execute(
+            counters_table.update()
+            .where(counters_table.c.department == department, counters_table.c.status == status)
+            .values(total=counters_table.c.total + delta)
+        )
+        if result.rowcount == 0:
+            connection.execute(counters_table.insert().values(department=department, status=status, total=delta))
+
+
+def count_rows(rows: Iterable[CounterKey]) -> Dict[CounterKey, int]:
+    """Deltas for a batch of newly inserted ``(department, status)`` pairs (bulk imports)."""
+    return dict(Counter(rows))
+
+
+def _write_all(connection: Connection, totals: Dict[CounterKey, int]) -> None:
+    connection.execute(counters_table.delete())
+    connection.execute(
+        counters_table.insert(),
+        [
+            {"department": dept, "status": status, "total": totals.get((dept, status), 0)}
+            for dept in Department
+            for status in RequirementStatus
+        ],
+    )
+
+
+def rebuild(connection: Connection) -> None:
+    """Recount every department and status from ``requirements``."""
+    totals = {
+        (department, status): total
+        for department, status, total in connection.execute(
+            select(Requirement.department, Requirement.status, func.count()).group_by(
+                Requirement.department, Requirement.status
+            )
+        )
+    }
+    _write_all(connection, totals)
+
+
+@event.listens_for(counters_table, "after_create")
+def _seed_counters(target, connection, **kw):
+    # Pre-create every row so concurrent writers only ever UPDATE.
+    if inspect(connection).has_table(Requirement.__tablename__):
+        rebuild(connection)
+    else:
+        _write_all(connection, {})
+
+
+@event.listens_for(Requirement, "after_insert")
+def _after_insert(mapper, connection, target):
+    apply_deltas(connection, {(target.department, target.status): 1})
+
+
+@event.listens_for(Requirement, "after_update")
+def _after_update(mapper, connection, target):
+    state = inspect(target)
+    department = state.attrs.department.history
+    status = state.attrs.status.history
+    if not (department.has_changes() or status.has_changes()):
+        return
+    old_department = department.deleted[0] if department.deleted else target.department
+    old_status = status.deleted[0] if status.deleted else target.status
+    deltas: Dict[CounterKey, int] = Counter()
+    deltas[(old_department, old_status)] -= 1
+    deltas[(target.department, target.status)] += 1
+    apply_deltas(connection, deltas)
+
+
+@event.listens_for(Requirement, "after_delete")
+def _after_delete(mapper, connection, target):
+    apply_deltas(connection, {(target.department, target.status): -1})
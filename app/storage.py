@@ -0,0 +1,267 @@
+"""Storage backends for uploaded files.
+
+``UPLOAD_STORAGE`` picks the backend:
+
+``local``
+    every key is a file directly in ``UPLOAD_FOLDER``.
+``sharded`` (default)
+    content-addressed keys live in ``UPLOAD_FOLDER/ab/cd/<key>`` so no
+    directory grows unbounded; other names stay flat.
+``s3``
+    an S3-compatible bucket (AWS, MinIO, Ceph...). Writes are streamed from
+    a spooled temp file with multipart upload, reads are answered with a
+    redirect to a presigned (or ``S3_PUBLIC_URL``) address, so web workers
+    need no shared filesystem. Requires ``boto3``.
+
+Keys are plain file names such as ``<sha256>.jpg`` or
+``<sha256>_thumb.webp``; what they mean is up to ``app.uploads``.
+"""
+from __future__ import annotations
+
+import os
+import re
+import shutil
+import tempfile
+from typing import BinaryIO, Iterator, Optional
+
+from flask import Flask, current_app
+
+
+_HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class StorageError(RuntimeError):
+    pass
+
+
+class Storage:
+    """Interface every backend implements."""
+
+    def put(self, key: str, stream: BinaryIO) -> None:
+        raise NotImplementedError
+
+    def put_file(self, key: str, path: str) -> None:
+        """Move the finished temp file at ``path`` into the store under ``key``."""
+        with open(path, "rb") as fh:
+            self.put(key, fh)
+        os.remove(path)
+
+    def open(self, key: str) -> BinaryIO:
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def mtime(self, key: str) -> Optional[float]:
+        raise NotImplementedError
+
+    def touch(self, key: str) -> None:
+        """Mark ``key`` as freshly used (keeps it out of garbage collection for a while)."""
+
+    def keys(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Filesystem path of ``key`` if the backend is on local disk."""
+        return None
+
+    def relative_path(self, key: str) -> str:
+        return key
+
+    def url(self, key: str) -> Optional[str]:
+        """Address clients should be redirected to, for backends not served by Flask."""
+        return None
+
+    def temp_dir(self) -> Optional[str]:
+        """Directory for in-progress writes; on local disk it must be on the store's filesystem."""
+        return None
+
+
+class LocalStorage(Storage):
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def relative_path(self, key: str) -> str:
+        return key
+
+    def local_path(self, key: str) -> str:
+        # Dot-prefixed names are the store's own workspace (.tmp, chunked uploads' .partial), never keys.
+        if any(part.startswith(".") for part in re.split(r"[\\/]", key)):
+            raise StorageError(f"Invalid storage key {key!r}")
+        path = os.path.normpath(os.path.join(self.root, self.relative_path(key)))
+        if not path.startswith(os.path.normpath(self.root) + os.sep):
+            raise StorageError(f"Invalid storage key {key!r}")
+        return path
+
+    def temp_dir(self) -> str:
+        path = os.path.join(self.root, ".tmp")
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def put(self, key: str, stream: BinaryIO) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.temp_dir())
+        with os.fdopen(fd, "wb") as tmp:
+            shutil.copyfileobj(stream, tmp, 64 * 1024)
+        self.put_file(key, tmp_path)
+
+    def put_file(self, key: str, path: str) -> None:
+        final_path = self.local_path(key)
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(path, final_path)
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self.local_path(key), "rb")
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self.local_path(key))
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self.local_path(key))
+        except FileNotFoundError:
+            pass
+
+    def mtime(self, key: str) -> Optional[float]:
+        try:
+            return os.path.getmtime(self.local_path(key))
+        except FileNotFoundError:
+            return None
+
+    def touch(self, key: str) -> None:
+        os.utime(self.local_path(key))
+
+    def keys(self) -> Iterator[str]:
+        for root, dirs, files in os.walk(self.root):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            yield from files
+
+
+class ShardedStorage(LocalStorage):
+    def relative_path(self, key: str) -> str:
+        stem = os.path.basename(key).split(".", 1)[0].split("_", 1)[0]
+        if not _HASH_RE.match(stem):
+            return key  # names from before content addressing
+        return os.path.join(stem[:2], stem[2:4], key)
+
+
+class S3Storage(Storage):
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        access_key: Optional[str] = None,
+        secret_key: Optional[str] = None,
+        public_url: Optional[str] = None,
+        presign_expires: int = 3600,
+        multipart_chunk_size: int = 8 * 1024 * 1024,
+    ):
+        try:
+            import boto3
+            from boto3.s3.transfer import TransferConfig
+        except ImportError as exc:  # pragma: no cover - depends on deployment
+            raise StorageError("UPLOAD_STORAGE=s3 requires the boto3 package") from exc
+
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.public_url = public_url.rstrip("/") if public_url else None
+        self.presign_expires = presign_expires
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url or None,
+            region_name=region or None,
+            aws_access_key_id=access_key or None,
+            aws_secret_access_key=secret_key or None,
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_chunk_size, multipart_chunksize=multipart_chunk_size
+        )
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def _is_missing(self, exc: Exception) -> bool:
+        code = getattr(exc, "response", {}).get("Error", {}).get("Code")
+        return code in {"404", "NoSuchKey", "NotFound"}
+
+    def put(self, key: str, stream: BinaryIO) -> None:
+        # upload_fileobj switches to multipart above the threshold and reads the stream chunk by chunk.
+        self.client.upload_fileobj(stream, self.bucket, self._object_key(key), Config=self.transfer_config)
+
+    def put_file(self, key: str, path: str) -> None:
+        self.client.upload_file(path, self.bucket, self._object_key(key), Config=self.transfer_config)
+        os.remove(path)
+
+    def open(self, key: str) -> BinaryIO:
+        spool = tempfile.SpooledTemporaryFile(max_size=4 * 1024 * 1024)
+        self.client.download_fileobj(self.bucket, self._object_key(key), spool, Config=self.transfer_config)
+        spool.seek(0)
+        return spool
+
+    def _head(self, key: str) -> Optional[dict]:
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        except Exception as exc:
+            if self._is_missing(exc):
+                return None
+            raise
+
+    def exists(self, key: str) -> bool:
+        return self._head(key) is not None
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+
+    def mtime(self, key: str) -> Optional[float]:
+        head = self._head(key)
+        return head["LastModified"].timestamp() if head else None
+
+    def keys(self) -> Iterator[str]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        prefix = f"{self.prefix}/" if self.prefix else ""
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for obj in page.get("Contents", ()):
+                yield obj["Key"][len(prefix):]
+
+    def url(self, key: str) -> str:
+        if self.public_url:
+            return f"{self.public_url}/{self._object_key(key)}"
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": self._object_key(key)},
+            ExpiresIn=self.presign_expires,
+        )
+
+
+def create_storage(app: Flask) -> Storage:
+    kind = app.config["UPLOAD_STORAGE"]
+    if kind == "local":
+        return LocalStorage(app.config["UPLOAD_FOLDER"])
+    if kind == "sharded":
+        return ShardedStorage(app.config["UPLOAD_FOLDER"])
+    if kind == "s3":
+        return S3Storage(
+            bucket=app.config["S3_BUCKET"],
+            prefix=app.config["S3_PREFIX"],
+            endpoint_url=app.config["S3_ENDPOINT_URL"],
+            region=app.config["S3_REGION"],
+            access_key=app.config["S3_ACCESS_KEY_ID"],
+            secret_key=app.config["S3_SECRET_ACCESS_KEY"],
+            public_url=app.config["S3_PUBLIC_URL"],
+            presign_expires=app.config["S3_PRESIGN_EXPIRES"],
+            multipart_chunk_size=app.config["S3_MULTIPART_CHUNK_SIZE"],
+        )
+    raise StorageError(f"Unknown UPLOAD_STORAGE {kind!r}")
+
+
+def init_app(app: Flask) -> None:
+    app.extensions["upload_storage"] = create_storage(app)
+
+
+def get_storage() -> Storage:
+    return current_app.extensions["upload_storage"]
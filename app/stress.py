@@ -0,0 +1,153 @@
+"""Concurrent database load from several processes (``flask stress-db``).
+
+Each worker process builds its own app, as a Gunicorn worker would, and
+for ``seconds`` runs a mix of the dashboards' reads (open requirements of a
+department, newest first, plus the status counts) and writes (creating a
+requirement, then moving its own requirements between statuses), each
+write committed through the ORM so the search index, counters and cache
+invalidation run as they do for a real edit.
+
+Every failed operation is counted; "database is locked" errors separately.
+With the SQLite profile from ``app.database`` (WAL, busy timeout) a run
+should finish without any. Compare with ``SQLITE_JOURNAL_MODE=delete
+SQLITE_BUSY_TIMEOUT_MS=0`` to see the errors the profile prevents. Use a
+copy of the database, never production: the requirements a run creates
+are deleted at the end.
+"""
+from __future__ import annotations
+
+import multiprocessing
+import random
+import statistics
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List
+from uuid import uuid4
+
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+
+from . import db, stats
+from .filters import RequirementFilters
+from .models import Department, Requirement, RequirementStatus, User
+from .pagination import list_select, page_statement
+
+
+OWN_ROWS = 20  # requirements each worker creates before it switches to status updates
+
+
+@dataclass
+class WorkerResult:
+    reads: List[float] = field(default_factory=list)
+    writes: List[float] = field(default_factory=list)
+    errors: Dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class Summary:
+    operation: str
+    count: int
+    per_second: float
+    p50_ms: float
+    p95_ms: float
+    max_ms: float
+
+
+def _read(rng: random.Random) -> None:
+    department = rng.choice(list(Department))
+    query = list_select().where(Requirement.department == department, *RequirementFilters(status="open").clauses())
+    db.session.execute(page_statement(query, size=50)).all()
+    stats.department_counts(department)
+    db.session.rollback()  # end the read transaction, as the end of a request does
+
+
+def _write(rng: random.Random, own: List[int], marker: str, created_by_id: int) -> None:
+    if len(own) < OWN_ROWS:
+        requirement = Requirement(
+            customer_name=marker,
+            contact_info="+91 90000 00000",
+            details="stress test",
+            department=rng.choice(list(Department)),
+            created_by_id=created_by_id,
+        )
+        db.session.add(requirement)
+        db.session.commit()
+        own.append(requirement.id)
+        return
+    requirement = db.session.get(Requirement, rng.choice(own))
+    requirement.status = rng.choice([status for status in RequirementStatus if status != requirement.status])
+    db.session.commit()
+
+
+def _worker(index: int, seconds: float, write_ratio: float, marker: str, created_by_id: int) -> WorkerResult:
+    from . import create_app
+
+    app = create_app()
+    rng = random.Random(index)
+    result = WorkerResult()
+    errors: Counter = Counter()
+    own: List[int] = []
+    with app.app_context():
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            writing = rng.random() < write_ratio
+            started = time.perf_counter()
+            try:
+                if writing:
+                    _write(rng, own, marker, created_by_id)
+                else:
+                    _read(rng)
+            except OperationalError as exc:
+                db.session.rollback()
+                errors["database is locked" if "locked" in str(exc.orig) else type(exc.orig).__name__] += 1
+                continue
+            elapsed = (time.perf_counter() - started) * 1000
+            (result.writes if writing else result.reads).append(elapsed)
+        db.session.remove()
+    result.errors = dict(errors)
+    return result
+
+
+def run(processes: int = 4, seconds: float = 10, write_ratio: float = 0.2) -> tuple[List[Summary], Dict[str, int]]:
+    """Run the workers; returns per-operation summaries and error counts. Call inside an app context."""
+    user = db.session.execute(select(User).order_by(User.id).limit(1)).scalar_one_or_none()
+    if user is None:
+        raise RuntimeError("no users; run `flask bootstrap` first")
+    marker = f"stress-{uuid4().hex[:12]}"
+    # spawn: a forked child would share the parent's open SQLite connections.
+    context = multiprocessing.get_context("spawn")
+    try:
+        with context.Pool(processes) as pool:
+            results = pool.starmap(
+                _worker, [(index, seconds, write_ratio, marker, user.id) for index in range(processes)]
+            )
+    finally:
+        _cleanup(marker)
+
+    errors: Counter = Counter()
+    for result in results:
+        errors.update(result.errors)
+    summaries = []
+    for operation in ("reads", "writes"):
+        samples = [sample for result in results for sample in getattr(result, operation)]
+        if not samples:
+            continue
+        summaries.append(
+            Summary(
+                operation=operation,
+                count=len(samples),
+                per_second=round(len(samples) / seconds, 1),
+                p50_ms=round(statistics.median(samples), 2),
+                p95_ms=round(statistics.quantiles(samples, n=20)[-1] if len(samples) > 1 else samples[0], 2),
+                max_ms=round(max(samples), 2),
+            )
+        )
+    return summaries, dict(errors)
+
+
+def _cleanup(marker: str) -> None:
+    # Through the ORM so counters and the search index follow.
+    for requirement in db.session.execute(select(Requirement).filter_by(customer_name=marker)).scalars():
+        db.session.delete(requirement)
+    db.session.commit()
@@ -0,0 +1,206 @@
+"""Content-addressed uploads.
+
+An upload is stored once under the SHA-256 of its bytes: the key
+``<sha256>.<ext>`` is what ``Requirement.image_filename`` holds, and
+re-uploading the same photo resolves to the existing object. Derived files
+(image variants) are keyed off the original. Where the bytes live is up to
+the configured backend in ``app.storage``.
+
+Files are reference counted by the rows that point at them: when a
+requirement is deleted or its image replaced, the old key is released after
+commit and removed with its variants once nothing references it any more.
+Names from before content addressing (``<uuid>.<ext>``) still resolve.
+"""
+from __future__ import annotations
+
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+import time
+from typing import BinaryIO, Iterator, Optional
+
+from flask import Response, abort, current_app, redirect, send_file
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session, object_session
+
+from . import db, metrics
+from .models import Requirement
+from .storage import StorageError, get_storage
+
+
+CHUNK_SIZE = 64 * 1024
+
+_HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+_RELEASED_KEY = "uploads_released"
+_EXTENSION_ALIASES = {"jpeg": "jpg"}
+
+
+def normalize_extension(ext: str) -> str:
+    ext = ext.lower()
+    return _EXTENSION_ALIASES.get(ext, ext)
+
+
+def content_hash(name: str) -> Optional[str]:
+    """The SHA-256 a stored name is addressed by, or None for legacy names."""
+    stem = os.path.basename(name).split(".", 1)[0].split("_", 1)[0]
+    return stem if _HASH_RE.match(stem) else None
+
+
+def send(name: str) -> Response:
+    """Serve a stored file with long-lived caching.
+
+    Stored names never change content (hash-named or random uuid), so
+    responses are ``public, immutable`` for a year with a strong ETag; Range
+    and conditional requests are answered by Werkzeug. With
+    ``UPLOAD_SENDFILE_MODE = "x-accel"`` only headers are produced and
+    Nginx streams the file from ``UPLOAD_ACCEL_PREFIX``; ``"x-sendfile"``
+    does the same for Apache/lighttpd through Flask's ``USE_X_SENDFILE``.
+    Backends with their own URLs (S3) get a redirect instead.
+    """
+    storage = get_storage()
+    try:
+        remote_url = storage.url(name)
+        path = storage.local_path(name)
+    except StorageError:
+        abort(404)
+    if remote_url:
+        response = redirect(remote_url)
+        # Presigned URLs expire, so the redirect itself may only be reused for a short while.
+        response.cache_control.private = True
+        response.cache_control.max_age = max(0, min(current_app.config["S3_PRESIGN_EXPIRES"] - 60, 3600))
+        return response
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    digest = content_hash(name)
+    etag = os.path.basename(name).rsplit(".", 1)[0] if digest else True
+    max_age = current_app.config["UPLOAD_CACHE_MAX_AGE"]
+
+    if current_app.config["UPLOAD_SENDFILE_MODE"] == "x-accel":
+        response = current_app.response_class(mimetype=mimetypes.guess_type(name)[0] or "application/octet-stream")
+        response.headers["X-Accel-Redirect"] = (
+            f"{current_app.config['UPLOAD_ACCEL_PREFIX'].rstrip('/')}/{storage.relative_path(name)}"
+        )
+        if digest:
+            response.set_etag(etag)
+    else:
+        response = send_file(path, etag=etag, max_age=max_age, conditional=True)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    response.cache_control.immutable = True
+    return response
+
+
+def store(stream: BinaryIO, ext: str) -> str:
+    """Write ``stream`` into the store and return its key.
+
+    The hash is computed while the bytes are copied to a temporary file,
+    which is then handed to the storage backend, or dropped if the same
+    content is already stored.
+    """
+    started = time.perf_counter()
+    storage = get_storage()
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=storage.temp_dir())
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                tmp.write(chunk)
+                size += len(chunk)
+        key = f"{digest.hexdigest()}.{normalize_extension(ext)}"
+        if storage.exists(key):
+            # Refresh mtime so a concurrent release() treats the file as in use.
+            storage.touch(key)
+        else:
+            storage.put_file(key, tmp_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    metrics.observe_upload(size, time.perf_counter() - started)
+    return key
+
+
+def reference_count(key: str) -> int:
+    # Own connection: release() runs from after_commit, when the session cannot emit SQL.
+    with db.engine.connect() as connection:
+        return connection.execute(
+            select(func.count()).select_from(Requirement).where(Requirement.image_filename == key)
+        ).scalar_one()
+
+
+def _derived_keys(key: str) -> Iterator[str]:
+    from .images import variant_name  # images depends on this module
+
+    yield key
+    for variant in ("thumb", "medium"):
+        yield variant_name(key, variant)
+
+
+def release(key: str) -> bool:
+    """Delete ``key`` and its variants if no requirement references it; returns True if removed.
+
+    Files touched within ``UPLOAD_GC_GRACE_SECONDS`` are kept: they may back
+    an upload whose requirement has not been committed yet.
+    """
+    if reference_count(key):
+        return False
+    storage = get_storage()
+    modified = storage.mtime(key)
+    if modified is not None and time.time() - modified < current_app.config["UPLOAD_GC_GRACE_SECONDS"]:
+        return False
+    removed = False
+    for name in _derived_keys(key):
+        if storage.exists(name):
+            storage.delete(name)
+            removed = True
+    return removed
+
+
+def sweep() -> int:
+    """Remove every stored original (and its variants) that nothing references; returns how many."""
+    referenced = set(
+        db.session.execute(select(Requirement.image_filename).where(Requirement.image_filename.is_not(None))).scalars()
+    )
+    removed = 0
+    for name in list(get_storage().keys()):
+        if "_" in name.split(".", 1)[0] or name in referenced:
+            continue  # variants go together with their original
+        if release(name):
+            removed += 1
+    return removed
+
+
+@event.listens_for(Requirement, "after_update")
+def _after_update(mapper, connection, target):
+    history = inspect(target).attrs.image_filename.history
+    session = object_session(target)
+    if session is not None:
+        for old in history.deleted or ():
+            if old:
+                session.info.setdefault(_RELEASED_KEY, set()).add(old)
+
+
+@event.listens_for(Requirement, "after_delete")
+def _after_delete(mapper, connection, target):
+    session = object_session(target)
+    if session is not None and target.image_filename:
+        session.info.setdefault(_RELEASED_KEY, set()).add(target.image_filename)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    released = session.info.pop(_RELEASED_KEY, None)
+    for key in released or ():
+        try:
+            release(key)
+        except Exception:
+            current_app.logger.exception("Could not release upload %s", key)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _after_rollback(session, previous_transaction):
+    session.info.pop(_RELEASED_KEY, None)
@@ -0,0 +1,117 @@
+"""Cache of the logged-in user for ``load_user``.
+
+Flask-Login resolves the session's user on every authenticated request.
+Instead of a ``SELECT`` each time, the columns views rely on (id, username,
+department, is_admin) are cached and turned back into a ``User`` attached
+to the request's session without touching the database; anything else on
+the user (relationships, ``password_hash``) still loads lazily on access.
+
+Entries are dropped after commit whenever one of those columns changes or
+the user is deleted. With ``CACHE_REDIS_URL`` set, processes share entries
+and the drop reaches every process's next shared lookup; each process's own
+copy lives at most ``USER_CACHE_TTL`` seconds.
+"""
+from __future__ import annotations
+
+from typing import Optional
+
+from flask import Flask, current_app
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+
+from . import db
+from .cache import LayeredCache, LRUCache, RedisCache
+from .models import Department, User
+
+
+CACHED_FIELDS = ("username", "department", "is_admin")
+
+_INVALIDATED_KEY = "user_cache_invalidated"
+
+
+def init_app(app: Flask) -> None:
+    shared = None
+    if app.config["CACHE_REDIS_URL"]:
+        shared = RedisCache(app.config["CACHE_REDIS_URL"], prefix="user:", ttl=app.config["USER_CACHE_SHARED_TTL"])
+    local = LRUCache(maxsize=app.config["USER_CACHE_SIZE"], ttl=app.config["USER_CACHE_TTL"])
+    app.extensions["user_cache"] = LayeredCache(local, shared)
+
+
+def _cache() -> LayeredCache:
+    return current_app.extensions["user_cache"]
+
+
+def _snapshot(user: User) -> dict:
+    return {
+        "id": user.id,
+        "username": user.username,
+        "department": user.department.value,
+        "is_admin": user.is_admin,
+    }
+
+
+def _restore(snapshot: dict) -> User:
+    user = User(
+        id=snapshot["id"],
+        username=snapshot["username"],
+        department=Department(snapshot["department"]),
+        is_admin=snapshot["is_admin"],
+    )
+    make_transient_to_detached(user)
+    # load=False attaches the snapshot as-is (or returns the instance already in the session) without a query.
+    return db.session.merge(user, load=False)
+
+
+def load(user_id: int) -> Optional[User]:
+    key = str(user_id)
+    try:
+        snapshot = _cache().get(key)
+    except Exception:
+        current_app.logger.exception("User cache lookup failed")
+        snapshot = None
+    if snapshot is not None:
+        return _restore(snapshot)
+
+    user = db.session.get(User, user_id)
+    if user is not None:
+        try:
+            _cache().set(key, _snapshot(user))
+        except Exception:
+            current_app.logger.exception("User cache store failed")
+    return user
+
+
+def invalidate(user_id: int) -> None:
+    try:
+        _cache().delete(str(user_id))
+    except Exception:
+        current_app.logger.exception("User cache invalidation failed")
+
+
+def _queue(target: User) -> None:
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_INVALIDATED_KEY, set()).add(target.id)
+
+
+@event.listens_for(User, "after_update")
+def _after_update(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in CACHED_FIELDS):
+        _queue(target)
+
+
+@event.listens_for(User, "after_delete")
+def _after_delete(mapper, connection, target):
+    _queue(target)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    for user_id in session.info.pop(_INVALIDATED_KEY, None) or ():
+        invalidate(user_id)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _after_rollback(session, previous_transaction):
+    session.info.pop(_INVALIDATED_KEY, None)
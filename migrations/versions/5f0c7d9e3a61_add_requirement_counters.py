@@ -0,0 +1,56 @@
+"""add requirement_counters
+
+Revision ID: 5f0c7d9e3a61
+Revises: 8ad89c032b88
+Create Date: 2026-10-18 10:48:05.671392
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '5f0c7d9e3a61'
+down_revision = '8ad89c032b88'
+branch_labels = None
+depends_on = None
+
+
+DEPARTMENTS = ('GIFTS', 'STATIONERY', 'TOYS', 'BOOKS')
+STATUSES = ('NEW', 'IN_PROGRESS', 'FULFILLED')
+
+
+def _enum(values, name):
+    # The PostgreSQL enum types already exist from the init migration.
+    return sa.Enum(*values, name=name).with_variant(postgresql.ENUM(*values, name=name, create_type=False), 'postgresql')
+
+
+def upgrade():
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table('requirement_counters'):
+        op.create_table('requirement_counters',
+        sa.Column('department', _enum(DEPARTMENTS, 'department'), nullable=False),
+        sa.Column('status', _enum(STATUSES, 'requirementstatus'), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('department', 'status')
+        )
+
+    # Seed every (department, status) pair from the existing rows.
+    op.execute("DELETE FROM requirement_counters")
+    counters = sa.table('requirement_counters', sa.column('department'), sa.column('status'), sa.column('total'))
+    totals = {
+        (department, status): total
+        for department, status, total in bind.execute(
+            sa.text("SELECT department, status, COUNT(*) FROM requirements GROUP BY department, status")
+        )
+    }
+    op.bulk_insert(counters, [
+        {'department': department, 'status': status, 'total': totals.get((department, status), 0)}
+        for department in DEPARTMENTS
+        for status in STATUSES
+    ])
+
+
+def downgrade():
+    op.drop_table('requirement_counters')
@@ -0,0 +1,45 @@
+"""add full-text search index for requirements
+
+Revision ID: 8ad89c032b88
+Revises: c3e8f1a24b90
+Create Date: 2026-10-18 10:02:17.226940
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8ad89c032b88'
+down_revision = 'c3e8f1a24b90'
+branch_labels = None
+depends_on = None
+
+
+SEARCH_FIELDS = "customer_name, contact_info, details, staff_name"
+PG_DOCUMENT = "coalesce(customer_name, '') || ' ' || coalesce(contact_info, '') || ' ' || coalesce(details, '') || ' ' || coalesce(staff_name, '')"
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS requirements_fts USING fts5({SEARCH_FIELDS}, "
+            "tokenize='unicode61 remove_diacritics 2')"
+        )
+        op.execute(f"INSERT INTO requirements_fts(rowid, {SEARCH_FIELDS}) SELECT id, {SEARCH_FIELDS} FROM requirements")
+    elif dialect == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute(f"CREATE INDEX ix_requirements_search_tsv ON requirements USING gin (to_tsvector('simple', {PG_DOCUMENT}))")
+        op.execute("CREATE INDEX ix_requirements_customer_name_trgm ON requirements USING gin (customer_name gin_trgm_ops)")
+        op.execute("CREATE INDEX ix_requirements_staff_name_trgm ON requirements USING gin (staff_name gin_trgm_ops)")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS requirements_fts")
+    elif dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_requirements_staff_name_trgm")
+        op.execute("DROP INDEX IF EXISTS ix_requirements_customer_name_trgm")
+        op.execute("DROP INDEX IF EXISTS ix_requirements_search_tsv")
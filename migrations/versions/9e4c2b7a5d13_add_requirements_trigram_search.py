@@ -0,0 +1,36 @@
+"""add trigram search table for name and contact substrings
+
+Revision ID: 9e4c2b7a5d13
+Revises: f2a97c1d6b38
+Create Date: 2026-10-18 14:20:41.503118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e4c2b7a5d13'
+down_revision = 'f2a97c1d6b38'
+branch_labels = None
+depends_on = None
+
+
+TRIGRAM_FIELDS = "customer_name, contact_info, staff_name"
+
+
+def upgrade():
+    # PostgreSQL already matches substrings through the pg_trgm indexes.
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS requirements_fts_trigram USING fts5({TRIGRAM_FIELDS}, "
+            "tokenize='trigram')"
+        )
+        op.execute(
+            f"INSERT INTO requirements_fts_trigram(rowid, {TRIGRAM_FIELDS}) SELECT id, {TRIGRAM_FIELDS} FROM requirements"
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS requirements_fts_trigram")
@@ -0,0 +1,26 @@
+"""add composite index for keyset pagination
+
+Revision ID: c3e8f1a24b90
+Revises: 4a40dea0b7e2
+Create Date: 2026-10-18 09:12:41.503118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e8f1a24b90'
+down_revision = '4a40dea0b7e2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('requirements', schema=None) as batch_op:
+        batch_op.create_index('ix_requirements_department_created_at_id', ['department', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('requirements', schema=None) as batch_op:
+        batch_op.drop_index('ix_requirements_department_created_at_id')